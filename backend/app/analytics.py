@@ -0,0 +1,172 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import BigInteger, Float, Integer, case, cast, column, func, select, table, text
+
+from app.models import LoanApplication, LOAN_COLUMNS
+
+# Low-cardinality columns that can be grouped by
+GROUP_COLUMNS = {
+    "employmentstatus", "educationlevel", "maritalstatus", "homeownershipstatus", "loanpurpose",
+    "loanapproved", "bankruptcyhistory", "previousloandefaults", "loanduration", "numberofdependents",
+}
+
+# Numeric columns that can be averaged, summed, bounded, bucketed and ranked
+MEASURE_COLUMNS = {
+    "age", "annualincome", "creditscore", "experience", "loanamount", "loanduration",
+    "debttoincomeratio", "totaldebttoincomeratio", "creditcardutilizationrate", "riskscore",
+    "interestrate", "monthlyloanpayment", "networth",
+}
+
+# Boolean columns whose share of true values can be reported
+RATE_COLUMNS = {"loanapproved", "bankruptcyhistory", "previousloandefaults"}
+
+AGGREGATES = {"avg", "sum", "min", "max"}
+
+# Upper bound on groups returned by one aggregate query
+MAX_GROUPS = 1000
+
+# Pre-aggregated rollup maintained by migrations/0002_loan_stats_rollup.sql
+ROLLUP_VIEW = "loan_stats_rollup"
+ROLLUP_GROUP_COLUMNS = ("employmentstatus", "educationlevel", "maritalstatus", "homeownershipstatus", "loanpurpose", "loanapproved")
+ROLLUP_MEASURE_COLUMNS = ("annualincome", "creditscore", "loanamount", "debttoincomeratio", "riskscore", "interestrate")
+
+rollup = table(
+    ROLLUP_VIEW,
+    *[column(name) for name in ROLLUP_GROUP_COLUMNS],
+    column("row_count"),
+    column("n_loanapproved"),
+    column("approved_count"),
+    *[column(f"{prefix}_{name}") for name in ROLLUP_MEASURE_COLUMNS for prefix in ("n", "sum", "min", "max")],
+)
+
+
+class Metric:
+    """One requested metric: ``count``, ``<avg|sum|min|max>:<column>``, ``p<NN>:<column>`` or ``rate:<column>``."""
+    
+    def __init__(self, spec: str):
+        self.spec = spec.strip().lower()
+        if self.spec == "count":
+            self.function, self.column, self.quantile = "count", None, None
+            self.name = "count"
+            return
+        
+        function, _, name = self.spec.partition(":")
+        self.function, self.column, self.quantile = function, name, None
+        
+        if function in AGGREGATES:
+            allowed = MEASURE_COLUMNS
+        elif function == "rate":
+            allowed = RATE_COLUMNS
+        elif len(function) > 1 and function[0] == "p" and function[1:].isdigit() and 0 < int(function[1:]) < 100:
+            allowed = MEASURE_COLUMNS
+            self.quantile = int(function[1:]) / 100
+        else:
+            raise ValueError(f"Unknown metric '{spec}'. Use count, avg/sum/min/max:<column>, p<1-99>:<column> or rate:<column>")
+        
+        if name not in allowed:
+            raise ValueError(f"Metric '{spec}' is not available for column '{name}'. Allowed: {', '.join(sorted(allowed))}")
+        self.name = f"{function}_{name}"
+    
+    def table_expression(self):
+        """Aggregate over LoanApplication rows."""
+        if self.function == "count":
+            return func.count()
+        target = LOAN_COLUMNS[self.column]
+        if self.function == "rate":
+            # Share of true among non-null values
+            return cast(func.avg(case((target.is_(True), 1.0), (target.is_(False), 0.0))), Float)
+        if self.quantile is not None:
+            return cast(func.percentile_cont(self.quantile).within_group(target), Float)
+        return cast(getattr(func, self.function)(target), Float)
+    
+    def rollup_expression(self):
+        """The same aggregate re-combined from the pre-aggregated rollup, or None if it cannot be."""
+        if self.function == "count":
+            return cast(func.sum(rollup.c.row_count), BigInteger)
+        if self.function == "rate":
+            if self.column != "loanapproved":
+                return None
+            return cast(func.sum(rollup.c.approved_count), Float) / func.nullif(func.sum(rollup.c.n_loanapproved), 0)
+        if self.column not in ROLLUP_MEASURE_COLUMNS or self.quantile is not None:
+            return None
+        if self.function == "avg":
+            return (
+                cast(func.sum(rollup.c[f"sum_{self.column}"]), Float)
+                / func.nullif(func.sum(rollup.c[f"n_{self.column}"]), 0)
+            )
+        return cast(getattr(func, self.function)(rollup.c[f"{self.function}_{self.column}"]), Float)
+
+
+def parse_group_by(group_by: Optional[str]) -> List[str]:
+    names = list(dict.fromkeys(name.strip().lower() for name in (group_by or "").split(",") if name.strip()))
+    unknown = [name for name in names if name not in GROUP_COLUMNS]
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(unknown)}. Allowed: {', '.join(sorted(GROUP_COLUMNS))}")
+    return names
+
+
+def parse_metrics(metrics: str) -> List[Metric]:
+    specs = [spec for spec in (metrics or "").split(",") if spec.strip()]
+    if not specs:
+        raise ValueError("At least one metric is required")
+    return list({metric.name: metric for metric in map(Metric, specs)}.values())
+
+
+def aggregate_statement(group_by: List[str], metrics: List[Metric], filters: Sequence[Any], use_rollup: bool = False):
+    """
+    GROUP BY query for the requested metrics.
+    
+    With ``use_rollup`` the query reads the pre-aggregated view when every group
+    column and metric can be recombined from it and no row filters apply;
+    returns ``(statement, used_rollup)``.
+    """
+    rollup_expressions = None
+    if use_rollup and not filters and all(name in ROLLUP_GROUP_COLUMNS for name in group_by):
+        rollup_expressions = [metric.rollup_expression() for metric in metrics]
+        if any(expression is None for expression in rollup_expressions):
+            rollup_expressions = None
+    
+    if rollup_expressions is not None:
+        keys = [rollup.c[name] for name in group_by]
+        expressions = rollup_expressions
+        source = rollup
+    else:
+        keys = [LOAN_COLUMNS[name] for name in group_by]
+        expressions = [metric.table_expression() for metric in metrics]
+        source = LoanApplication.__table__
+    
+    stmt = select(*keys, *[expression.label(metric.name) for expression, metric in zip(expressions, metrics)]).select_from(source)
+    if rollup_expressions is None:
+        stmt = stmt.where(*filters)
+    if keys:
+        stmt = stmt.group_by(*keys).order_by(*keys).limit(MAX_GROUPS)
+    return stmt, rollup_expressions is not None
+
+
+def histogram_statement(name: str, bins: int, low: float, high: float, group_by: List[str], filters: Sequence[Any]):
+    """Per-group counts of ``name`` in ``bins`` equal-width buckets over [low, high]."""
+    target = cast(LOAN_COLUMNS[name], Float)
+    width = (high - low) / bins
+    # Values equal to the upper edge belong to the last bucket
+    bucket = case((target >= high, bins - 1), else_=cast(func.floor((target - low) / width), Integer)).label("bucket")
+    keys = [LOAN_COLUMNS[group] for group in group_by]
+    return (
+        select(*keys, bucket, func.count().label("count"))
+        .where(*filters, target >= low, target <= high)
+        .group_by(*keys, bucket)
+        .order_by(*keys, bucket)
+    )
+
+
+def histogram_groups(rows: Sequence[Any], group_by: List[str], bins: int) -> List[Dict[str, Any]]:
+    """Fold ``(keys..., bucket, count)`` rows into one dense counts list per group."""
+    groups: Dict[Tuple[Any, ...], List[int]] = {}
+    for row in rows:
+        key = tuple(row[:len(group_by)])
+        counts = groups.setdefault(key, [0] * bins)
+        # Guard against float rounding just below the upper edge
+        counts[min(row.bucket, bins - 1)] += row.count
+    return [{**dict(zip(group_by, key)), "counts": counts} for key, counts in groups.items()]
+
+
+REFRESH_ROLLUP_SQL = text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {ROLLUP_VIEW}")
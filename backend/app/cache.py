@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry."""
+    
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._versions: Dict[str, int] = defaultdict(int)
+    
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+    
+    async def get_version(self, namespace: str) -> int:
+        return self._versions[namespace]
+    
+    async def bump_version(self, namespace: str) -> None:
+        self._versions[namespace] += 1
+    
+    def size(self) -> int:
+        return len(self._entries)
+    
+    async def aclose(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache stored in Redis, or any server speaking the Redis protocol."""
+    
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis.from_url(url, decode_responses=True)
+    
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(key)
+    
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self._redis.set(key, value, px=int(ttl * 1000))
+    
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+    
+    async def get_version(self, namespace: str) -> int:
+        return int(await self._redis.get(f"cache-version:{namespace}") or 0)
+    
+    async def bump_version(self, namespace: str) -> None:
+        await self._redis.incr(f"cache-version:{namespace}")
+    
+    def size(self) -> Optional[int]:
+        return None
+    
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+class ResponseCache:
+    """
+    Namespaced JSON cache over a pluggable backend, with hit/miss counters.
+    
+    Keys are hashes of the normalised key parts. Every namespace carries a version
+    that is part of the key, so a whole namespace can be invalidated in O(1) by
+    bumping it; stale entries then simply age out. Single keys carry a version too,
+    bumped by ``invalidate``, so a reader can take ``version()`` before loading a value
+    and ``set(..., version=...)`` then refuses to store it if a write happened since.
+    
+    Backend failures are logged and treated as misses so the cache can never take
+    a request down.
+    """
+    
+    def __init__(self, backend, default_ttl: float = 300.0):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+    
+    @staticmethod
+    def _digest(key_parts: Any) -> str:
+        encoded = json.dumps(key_parts, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    
+    async def _key(self, namespace: str, key_parts: Any) -> str:
+        version = await self.backend.get_version(namespace)
+        return f"cache:{namespace}:{version}:{self._digest(key_parts)}"
+    
+    async def version(self, namespace: str, key_parts: Any) -> Optional[Tuple[int, int]]:
+        """The namespace and key versions, to pass to ``set`` once the value has been loaded."""
+        try:
+            return (
+                await self.backend.get_version(namespace),
+                await self.backend.get_version(f"{namespace}/{self._digest(key_parts)}"),
+            )
+        except Exception as e:
+            logger.warning(f"Cache version failed: namespace={namespace}, error={str(e)}")
+            return None
+    
+    async def get(self, namespace: str, key_parts: Any) -> Optional[Any]:
+        try:
+            value = await self.backend.get(await self._key(namespace, key_parts))
+        except Exception as e:
+            logger.warning(f"Cache get failed: namespace={namespace}, error={str(e)}")
+            value = None
+        
+        self._stats[namespace]["hits" if value is not None else "misses"] += 1
+        return json.loads(value) if value is not None else None
+    
+    async def set(
+        self,
+        namespace: str,
+        key_parts: Any,
+        value: Any,
+        ttl: Optional[float] = None,
+        version: Optional[Tuple[int, int]] = None
+    ) -> None:
+        """
+        Store a value. With ``version`` (from ``version()`` before the value was loaded),
+        nothing is stored if the key or namespace has been invalidated in the meantime.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        try:
+            if version is not None and await self.version(namespace, key_parts) != version:
+                return
+            key = await self._key(namespace, key_parts)
+            await self.backend.set(key, json.dumps(value, default=str), ttl)
+            # An invalidation that landed between the check and the write bumped the version
+            # before deleting; if so, delete what was just written too
+            if version is not None and await self.version(namespace, key_parts) != version:
+                await self.backend.delete(key)
+        except Exception as e:
+            logger.warning(f"Cache set failed: namespace={namespace}, error={str(e)}")
+    
+    async def invalidate(self, namespace: str, key_parts: Any) -> None:
+        try:
+            # Bump first, so a concurrent versioned set either sees the bump or is deleted below
+            await self.backend.bump_version(f"{namespace}/{self._digest(key_parts)}")
+            await self.backend.delete(await self._key(namespace, key_parts))
+        except Exception as e:
+            logger.warning(f"Cache invalidate failed: namespace={namespace}, error={str(e)}")
+    
+    async def invalidate_namespace(self, namespace: str) -> None:
+        try:
+            await self.backend.bump_version(namespace)
+        except Exception as e:
+            logger.warning(f"Cache namespace invalidation failed: namespace={namespace}, error={str(e)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "namespaces": {namespace: dict(counts) for namespace, counts in self._stats.items()},
+        }
+    
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+
+def create_response_cache(
+    backend: str = "memory",
+    url: Optional[str] = None,
+    max_entries: int = 10000,
+    default_ttl: float = 300.0
+) -> ResponseCache:
+    """Factory function to create the response cache for the configured backend."""
+    if backend == "memory":
+        return ResponseCache(MemoryCacheBackend(max_entries=max_entries), default_ttl=default_ttl)
+    if backend == "redis":
+        if not url:
+            raise ValueError("CACHE_URL is required for the redis cache backend")
+        return ResponseCache(RedisCacheBackend(url), default_ttl=default_ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
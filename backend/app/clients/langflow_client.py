@@ -1,28 +1,162 @@
 import httpx
 import asyncio
 import json
-from typing import Dict, Any, Optional, List
+from opentelemetry import trace
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator, Union
 from ..schemas.chat import ChatMessage, ChatResponse
+from ..tracing import tracer, inject_trace_headers
+from .resilience import (
+    CircuitBreaker,
+    LatencyWindow,
+    RETRYABLE_EXCEPTIONS,
+    RETRYABLE_STATUS_CODES,
+    READ_ONLY_RETRYABLE_STATUS_CODES,
+    backoff_delay,
+    hedged,
+)
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, json is the fallback
+    orjson = None
+
+# JSON pointer (RFC 6901) to the reply text in a LangFlow run result
+DEFAULT_OUTPUT_PATH = "/outputs/0/outputs/0/results/message/text"
+
+_MISSING = object()
+
+
+def loads(content: Union[bytes, str]) -> Any:
+    """Decode JSON with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def compile_json_pointer(pointer: str) -> Tuple[Union[str, int], ...]:
+    """Split a JSON pointer into keys once, with numeric tokens pre-converted for list indexing."""
+    if pointer == "":
+        return ()
+    if not pointer.startswith("/"):
+        raise ValueError(f"Invalid JSON pointer: {pointer!r}")
+    tokens = []
+    for token in pointer[1:].split("/"):
+        token = token.replace("~1", "/").replace("~0", "~")
+        tokens.append(int(token) if token.isdigit() else token)
+    return tuple(tokens)
+
+
+def resolve_json_pointer(data: Any, tokens: Tuple[Union[str, int], ...]) -> Any:
+    """Follow compiled pointer tokens through ``data``; returns _MISSING if any step is absent."""
+    for token in tokens:
+        if isinstance(data, dict):
+            data = data.get(str(token) if isinstance(token, int) else token, _MISSING)
+        elif isinstance(data, list) and isinstance(token, int):
+            data = data[token] if token < len(data) else _MISSING
+        else:
+            return _MISSING
+        if data is _MISSING:
+            return _MISSING
+    return data
+
+
+def truncate(text: Union[bytes, str], limit: int) -> str:
+    """Cap a payload before it is logged."""
+    if isinstance(text, bytes):
+        text = text[:limit + 1].decode("utf-8", errors="replace")
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated]"
+
 
 class LangFlowClient:
-    def __init__(self, base_url: str, api_key: str, flow_id: str):
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        flow_id: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        max_retries: int = 2,
+        retry_backoff: float = 0.25,
+        retry_backoff_max: float = 4.0,
+        hedge_percentile: Optional[float] = None,
+        flow_read_only: bool = False,
+        breaker_failure_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        output_path: str = DEFAULT_OUTPUT_PATH,
+        max_logged_payload: int = 2000
+    ):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.flow_id = flow_id
         self.timeout = httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested for LangFlow but the 'h2' package is not installed, falling back to HTTP/1.1")
+                http2 = False
+        self.http2 = http2
+        
+        # Long-lived pooled client shared by every chat turn so connections
+        # (and their TLS sessions) are reused instead of re-established per call
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2,
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+        
+        # Connect errors and 503 are retried with jittered backoff: the flow cannot have
+        # run, so a retry never repeats its work. A 502 may come after the flow ran (the
+        # proxy lost the upstream mid-response), so it is retried for read-only flows only
+        self.retryable_status_codes = READ_ONLY_RETRYABLE_STATUS_CODES if flow_read_only else RETRYABLE_STATUS_CODES
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        
+        # Hedging is different: both requests run the whole flow, under one session_id, and
+        # cancelling the losing one locally does not stop it on the server. Tools that write
+        # (e.g. UpdateLoanTool, DeleteLoanTool) could run twice, so only read-only flows hedge
+        if hedge_percentile and not flow_read_only:
+            logger.warning("LangFlow hedging needs a read-only flow (LANGFLOW_FLOW_READ_ONLY=true), leaving it off")
+            hedge_percentile = None
+        self.flow_read_only = flow_read_only
+        self.hedge_percentile = hedge_percentile
+        self.breaker = CircuitBreaker(breaker_failure_threshold, breaker_reset_timeout)
+        self.latency = LatencyWindow()
+        self.retries = 0
+        self.hedges = 0
+        
+        # Where the reply text lives in a run result, compiled once instead of per response
+        self.output_path = output_path
+        self._output_tokens = compile_json_pointer(output_path)
+        self.max_logged_payload = max_logged_payload
     
-    async def send_message(
-        self, 
-        messages: List[ChatMessage], 
-        session_id: str, 
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        await self._client.aclose()
+    
+    def _build_request(
+        self,
+        messages: List[ChatMessage],
+        session_id: str,
         correlation_id: str
-    ) -> ChatResponse:
-        """Send messages to LangFlow and return the response."""
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """Build the LangFlow run URL, payload and headers for a chat turn."""
         
         # Convert messages to the format LangFlow expects
         # Typically the last user message is used as the main input
@@ -49,107 +183,364 @@ class LangFlowClient:
         }
         
         headers = {
-            "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "X-Correlation-ID": correlation_id
         }
         
         url = f"{self.base_url}/api/v1/run/{self.flow_id}"
         
+        return url, payload, headers
+    
+    def _parse_output(self, data: Any, correlation_id: str) -> str:
+        """Pull the reply text from a decoded run result via the configured path, else the legacy search."""
+        text = resolve_json_pointer(data, self._output_tokens)
+        if isinstance(text, str):
+            return text
+        return self._extract_output_text(data, correlation_id)
+    
+    def _extract_output_text(self, data: Dict[str, Any], correlation_id: str) -> str:
+        """Extract the assistant message text from a LangFlow run result."""
+        # LangFlow typically returns the result in data.outputs[0].outputs[0].results.message.text
+        # or similar nested structure - adjust based on your MedFi flow output structure
+        if "outputs" in data and data["outputs"]:
+            output_data = data["outputs"][0]
+            if "outputs" in output_data and output_data["outputs"]:
+                result = output_data["outputs"][0]
+                if "results" in result:
+                    message_data = result["results"]
+                    if isinstance(message_data, dict) and "message" in message_data:
+                        return message_data["message"].get("text", "")
+                    elif isinstance(message_data, dict) and "text" in message_data:
+                        return message_data["text"]
+                    return str(message_data)
+                return str(result)
+            return str(output_data)
+        
+        # Fallback: look for common response patterns
+        if "result" in data:
+            return str(data["result"])
+        elif "message" in data:
+            return str(data["message"])
+        
+        logger.warning(f"Unexpected LangFlow response structure: correlation_id={correlation_id}")
+        return "Response received but could not extract message"
+    
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Circuit breaker state plus retry and hedging counters, for /health."""
+        hedge_after = self.latency.percentile(self.hedge_percentile) if self.hedge_percentile else None
+        return {
+            "circuit": self.breaker.stats(),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_after_ms": int(hedge_after * 1000) if hedge_after is not None else None
+        }
+    
+    def _retry_delay(self, attempt: int, correlation_id: str, reason: str, retry_after: Optional[str] = None) -> float:
+        """Count a retry and return how long to back off before it."""
+        delay = backoff_delay(attempt, self.retry_backoff, self.retry_backoff_max, retry_after)
+        self.retries += 1
+        trace.get_current_span().add_event("retry", {"attempt": attempt + 1, "reason": reason, "delay_s": delay})
+        logger.warning(
+            f"Retrying LangFlow request: correlation_id={correlation_id}, attempt={attempt + 1}, "
+            f"reason={reason}, delay={delay:.2f}s"
+        )
+        return delay
+    
+    async def _post(self, url: str, payload: Dict[str, Any], headers: Dict[str, str]) -> httpx.Response:
+        """POST once, hedging with a second request if this call is unusually slow (read-only flows only)."""
+        hedge_after = self.latency.percentile(self.hedge_percentile) if self.hedge_percentile else None
+        if hedge_after is None:
+            return await self._client.post(url, json=payload, headers=headers)
+        
+        started = [0]
+        
+        def attempt():
+            started[0] += 1
+            return self._client.post(url, json=payload, headers=headers)
+        
+        try:
+            return await hedged(attempt, hedge_after)
+        finally:
+            self.hedges += started[0] - 1
+    
+    async def _post_with_retries(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        correlation_id: str
+    ) -> httpx.Response:
+        """POST the run, retrying only failures that cannot have executed the flow."""
+        attempt = 0
+        while True:
+            try:
+                response = await self._post(url, payload, headers)
+            except RETRYABLE_EXCEPTIONS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt, correlation_id, type(e).__name__)
+            else:
+                if response.status_code not in self.retryable_status_codes or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_delay(
+                    attempt, correlation_id, f"status {response.status_code}", response.headers.get("Retry-After")
+                )
+            
+            attempt += 1
+            await asyncio.sleep(delay)
+    
+    def _translate_error(self, e: httpx.HTTPError, correlation_id: str) -> Exception:
+        """Map an httpx failure onto the exception types the API layer handles."""
+        if isinstance(e, httpx.TimeoutException):
+            logger.error(f"LangFlow timeout: correlation_id={correlation_id}, error={str(e)}")
+            return TimeoutError(f"LangFlow request timed out after {self.timeout.read}s")
+        
+        if isinstance(e, httpx.HTTPStatusError):
+            logger.error(f"LangFlow HTTP error: correlation_id={correlation_id}, status={e.response.status_code}, body={truncate(e.response.content, self.max_logged_payload)}")
+            if e.response.status_code == 401:
+                return ValueError("Invalid LangFlow API key")
+            elif e.response.status_code == 404:
+                return ValueError("LangFlow flow not found")
+            elif e.response.status_code >= 500:
+                return RuntimeError(f"LangFlow server error: {e.response.status_code}")
+            return RuntimeError(f"LangFlow request failed: {e.response.status_code}")
+        
+        logger.error(f"LangFlow connection error: correlation_id={correlation_id}, error={str(e)}")
+        return ConnectionError(f"Failed to connect to LangFlow: {str(e)}")
+    
+    async def send_message(
+        self, 
+        messages: List[ChatMessage], 
+        session_id: str, 
+        correlation_id: str
+    ) -> ChatResponse:
+        """Send messages to LangFlow and return the response."""
+        with tracer.start_as_current_span(
+            "langflow.send_message",
+            kind=trace.SpanKind.CLIENT,
+            attributes={"correlation_id": correlation_id, "session_id": session_id, "langflow.flow_id": self.flow_id}
+        ):
+            return await self._send_message(messages, session_id, correlation_id)
+    
+    async def _send_message(
+        self,
+        messages: List[ChatMessage],
+        session_id: str,
+        correlation_id: str
+    ) -> ChatResponse:
+        url, payload, headers = self._build_request(messages, session_id, correlation_id)
+        inject_trace_headers(headers)
+        
         start_time = time.time()
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        # Fails fast with CircuitOpenError while LangFlow is known to be down
+        self.breaker.before_call()
+        
+        try:
+            logger.info(f"Sending request to LangFlow: correlation_id={correlation_id}, session_id={session_id}")
+            
+            response = await self._post_with_retries(url, payload, headers, correlation_id)
+            
+            elapsed_time = time.time() - start_time
+            logger.info(f"LangFlow response received: correlation_id={correlation_id}, status={response.status_code}, elapsed={elapsed_time:.2f}s")
+            
+            trace.get_current_span().set_attribute("http.status_code", response.status_code)
+            response.raise_for_status()
+        
+        except BaseException as e:
+            self.breaker.record(e)
+            if isinstance(e, httpx.HTTPError):
+                raise self._translate_error(e, correlation_id) from e
+            raise
+        
+        self.breaker.record()
+        self.latency.add(elapsed_time)
+        
+        with tracer.start_as_current_span("langflow.parse_response", attributes={"response.bytes": len(response.content)}):
             try:
-                logger.info(f"Sending request to LangFlow: correlation_id={correlation_id}, session_id={session_id}")
-                
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=headers
+                output_text = self._parse_output(loads(response.content), correlation_id)
+            
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                logger.error(
+                    f"Failed to parse LangFlow response: correlation_id={correlation_id}, error={str(e)}, "
+                    f"response={truncate(response.content, self.max_logged_payload)}"
                 )
-                
-                elapsed_time = time.time() - start_time
-                logger.info(f"LangFlow response received: correlation_id={correlation_id}, status={response.status_code}, elapsed={elapsed_time:.2f}s")
-                
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                # Extract the output text from LangFlow response
-                # LangFlow typically returns the result in data.outputs[0].outputs[0].results.message.text
-                # or similar nested structure - adjust based on your MedFi flow output structure
+                return ChatResponse(
+                    output_text="I encountered an issue processing your request. Please try again.",
+                    meta={
+                        "session_id": session_id,
+                        "correlation_id": correlation_id,
+                        "error": "response_parsing_failed",
+                        "response_time_ms": int(elapsed_time * 1000)
+                    }
+                )
+        
+        return ChatResponse(
+            output_text=output_text,
+            meta={
+                "session_id": session_id,
+                "correlation_id": correlation_id,
+                "response_time_ms": int(elapsed_time * 1000),
+                "flow_id": self.flow_id
+            }
+        )
+    
+    async def stream_message(
+        self,
+        messages: List[ChatMessage],
+        session_id: str,
+        correlation_id: str
+    ) -> AsyncIterator[str]:
+        """
+        Run the flow in LangFlow's streaming mode and yield text chunks as they arrive.
+        
+        LangFlow emits one JSON event per line (``token``, ``add_message``, ``end``,
+        ``error``). Token chunks are yielded directly; if the flow produced no tokens
+        (e.g. a non-streaming model component), the final message from the ``end``
+        event is yielded as a single chunk instead.
+        """
+        url, payload, headers = self._build_request(messages, session_id, correlation_id)
+        
+        start_time = time.time()
+        streamed_tokens = False
+        
+        # Not made the current span: a generator can be resumed from another context
+        span = tracer.start_span(
+            "langflow.stream_message",
+            kind=trace.SpanKind.CLIENT,
+            attributes={"correlation_id": correlation_id, "session_id": session_id, "langflow.flow_id": self.flow_id}
+        )
+        inject_trace_headers(headers, span)
+        
+        try:
+            self.breaker.before_call()
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+            span.end()
+            raise
+        
+        try:
+            logger.info(f"Sending streaming request to LangFlow: correlation_id={correlation_id}, session_id={session_id}")
+            
+            attempt = 0
+            while True:
+                delay = None
                 try:
-                    if "outputs" in data and data["outputs"]:
-                        output_data = data["outputs"][0]
-                        if "outputs" in output_data and output_data["outputs"]:
-                            result = output_data["outputs"][0]
-                            if "results" in result:
-                                message_data = result["results"]
-                                if isinstance(message_data, dict) and "message" in message_data:
-                                    output_text = message_data["message"].get("text", "")
-                                elif isinstance(message_data, dict) and "text" in message_data:
-                                    output_text = message_data["text"]
-                                else:
-                                    output_text = str(message_data)
-                            else:
-                                output_text = str(result)
-                        else:
-                            output_text = str(output_data)
-                    else:
-                        # Fallback: look for common response patterns
-                        if "result" in data:
-                            output_text = str(data["result"])
-                        elif "message" in data:
-                            output_text = str(data["message"])
+                    async with self._client.stream(
+                        "POST",
+                        url,
+                        params={"stream": "true"},
+                        json=payload,
+                        headers=headers
+                    ) as response:
+                        if response.status_code in self.retryable_status_codes and attempt < self.max_retries:
+                            delay = self._retry_delay(
+                                attempt, correlation_id, f"status {response.status_code}", response.headers.get("Retry-After")
+                            )
                         else:
-                            output_text = "Response received but could not extract message"
-                            logger.warning(f"Unexpected LangFlow response structure: correlation_id={correlation_id}")
-                    
-                    return ChatResponse(
-                        output_text=output_text,
-                        meta={
-                            "session_id": session_id,
-                            "correlation_id": correlation_id,
-                            "response_time_ms": int(elapsed_time * 1000),
-                            "flow_id": self.flow_id
-                        }
-                    )
+                            if response.status_code >= 400:
+                                await response.aread()
+                            response.raise_for_status()
+                            
+                            async for line in response.aiter_lines():
+                                line = line.strip()
+                                if line.startswith("data:"):
+                                    line = line[len("data:"):].strip()
+                                if not line:
+                                    continue
+                                
+                                try:
+                                    event = loads(line)
+                                except ValueError:
+                                    logger.warning(f"Skipping malformed LangFlow stream line: correlation_id={correlation_id}")
+                                    continue
+                                
+                                event_type = event.get("event")
+                                event_data = event.get("data") or {}
+                                
+                                if event_type == "token":
+                                    chunk = event_data.get("chunk", "")
+                                    if chunk:
+                                        streamed_tokens = True
+                                        yield chunk
+                                
+                                elif event_type == "error":
+                                    raise RuntimeError(f"LangFlow stream error: {event_data.get('error', event_data)}")
+                                
+                                elif event_type == "end":
+                                    if not streamed_tokens:
+                                        try:
+                                            yield self._parse_output(event_data.get("result") or {}, correlation_id)
+                                        except (KeyError, IndexError, TypeError, AttributeError) as e:
+                                            logger.error(f"Failed to parse LangFlow stream result: correlation_id={correlation_id}, error={str(e)}")
+                                            raise RuntimeError("Failed to parse LangFlow response") from e
+                                    break
                 
-                except (KeyError, IndexError, TypeError) as e:
-                    logger.error(f"Failed to parse LangFlow response: correlation_id={correlation_id}, error={str(e)}, response={data}")
-                    return ChatResponse(
-                        output_text="I encountered an issue processing your request. Please try again.",
-                        meta={
-                            "session_id": session_id,
-                            "correlation_id": correlation_id,
-                            "error": "response_parsing_failed",
-                            "response_time_ms": int(elapsed_time * 1000)
-                        }
-                    )
-            
-            except httpx.TimeoutException as e:
-                logger.error(f"LangFlow timeout: correlation_id={correlation_id}, error={str(e)}")
-                raise TimeoutError(f"LangFlow request timed out after {self.timeout.read}s")
-            
-            except httpx.HTTPStatusError as e:
-                logger.error(f"LangFlow HTTP error: correlation_id={correlation_id}, status={e.response.status_code}, body={e.response.text}")
-                if e.response.status_code == 401:
-                    raise ValueError("Invalid LangFlow API key")
-                elif e.response.status_code == 404:
-                    raise ValueError("LangFlow flow not found")
-                elif e.response.status_code >= 500:
-                    raise RuntimeError(f"LangFlow server error: {e.response.status_code}")
-                else:
-                    raise RuntimeError(f"LangFlow request failed: {e.response.status_code}")
+                except RETRYABLE_EXCEPTIONS as e:
+                    # Raised while connecting, so nothing has been streamed yet
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._retry_delay(attempt, correlation_id, type(e).__name__)
+                
+                if delay is None:
+                    break
+                attempt += 1
+                await asyncio.sleep(delay)
             
-            except httpx.RequestError as e:
-                logger.error(f"LangFlow connection error: correlation_id={correlation_id}, error={str(e)}")
-                raise ConnectionError(f"Failed to connect to LangFlow: {str(e)}")
-
+            elapsed_time = time.time() - start_time
+            logger.info(f"LangFlow stream completed: correlation_id={correlation_id}, elapsed={elapsed_time:.2f}s")
+        
+        except BaseException as e:
+            self.breaker.record(e)
+            if isinstance(e, Exception):
+                span.record_exception(e)
+                span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+            span.end()
+            if isinstance(e, httpx.HTTPError):
+                raise self._translate_error(e, correlation_id) from e
+            raise
+        
+        self.breaker.record()
+        span.end()
 
-def create_langflow_client(base_url: str, api_key: str, flow_id: str) -> LangFlowClient:
+def create_langflow_client(
+    base_url: str,
+    api_key: str,
+    flow_id: str,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    http2: bool = False,
+    max_retries: int = 2,
+    retry_backoff: float = 0.25,
+    retry_backoff_max: float = 4.0,
+    hedge_percentile: Optional[float] = None,
+    flow_read_only: bool = False,
+    breaker_failure_threshold: int = 5,
+    breaker_reset_timeout: float = 30.0,
+    output_path: str = DEFAULT_OUTPUT_PATH,
+    max_logged_payload: int = 2000
+) -> LangFlowClient:
     """Factory function to create a LangFlow client instance."""
     if not base_url or not api_key or not flow_id:
         raise ValueError("Missing required LangFlow configuration")
     
-    return LangFlowClient(base_url=base_url, api_key=api_key, flow_id=flow_id)
\ No newline at end of file
+    return LangFlowClient(
+        base_url=base_url,
+        api_key=api_key,
+        flow_id=flow_id,
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+        http2=http2,
+        max_retries=max_retries,
+        retry_backoff=retry_backoff,
+        retry_backoff_max=retry_backoff_max,
+        hedge_percentile=hedge_percentile,
+        flow_read_only=flow_read_only,
+        breaker_failure_threshold=breaker_failure_threshold,
+        breaker_reset_timeout=breaker_reset_timeout,
+        output_path=output_path,
+        max_logged_payload=max_logged_payload
+    )
\ No newline at end of file
@@ -0,0 +1,154 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+
+# 503 means LangFlow (or the proxy in front of it) refused the run, so repeating it
+# cannot execute the flow twice
+RETRYABLE_STATUS_CODES = frozenset({503})
+
+# A proxy also answers 502 when the upstream resets or times out partway through a
+# response, after the flow has run; only a flow without side effects may repeat then
+READ_ONLY_RETRYABLE_STATUS_CODES = frozenset({502, 503})
+
+# Failures raised before the request was sent
+RETRYABLE_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling LangFlow while the circuit breaker is open."""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[str] = None) -> float:
+    """
+    Full-jitter exponential backoff for the given (zero-based) retry attempt.
+    
+    A numeric ``Retry-After`` from the server raises the delay, bounded by ``cap``.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return min(delay, cap)
+
+
+def is_failure(exc: Optional[BaseException]) -> bool:
+    """Whether an outcome means LangFlow itself is unhealthy."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    
+    After ``failure_threshold`` failed calls in a row the circuit opens and calls fail
+    fast for ``reset_timeout`` seconds. One trial call is then let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.times_opened = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+    
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not be attempted."""
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError("LangFlow circuit is open", math.ceil(remaining))
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError("LangFlow circuit is half-open, trial call in progress", 1)
+            self._trial_in_flight = True
+    
+    def record(self, exc: Optional[BaseException] = None) -> None:
+        """Record the outcome of a call let through by before_call."""
+        self._trial_in_flight = False
+        
+        if exc is None or isinstance(exc, httpx.HTTPStatusError) and not is_failure(exc):
+            # LangFlow answered, even if it rejected the request
+            self.state = self.CLOSED
+            self.failures = 0
+        elif is_failure(exc):
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+        }
+
+
+class LatencyWindow:
+    """Sliding window of recent call latencies (seconds) for percentile estimates."""
+    
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+    
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+    
+    def percentile(self, p: float) -> Optional[float]:
+        """The ``p``-th percentile, or None until enough samples were seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[index]
+
+
+async def hedged(call: Callable[[], Awaitable[Any]], delay: float) -> Any:
+    """
+    Run ``call`` and, if it has not finished after ``delay`` seconds, race a second
+    copy of it. The first successful result wins and the other call is cancelled.
+    """
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks.append(asyncio.ensure_future(call()))
+        
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
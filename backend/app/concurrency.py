@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """Raised when a request is shed instead of queued."""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyGate:
+    """
+    Bounds concurrent work with a semaphore plus a bounded wait queue.
+    
+    Callers beyond ``max_concurrent`` wait for a slot; once ``max_waiting`` callers
+    are already waiting, or a wait exceeds ``wait_timeout``, the call is rejected
+    with OverloadedError so load is shed quickly instead of timing out upstream.
+    """
+    
+    def __init__(self, max_concurrent: int = 20, max_waiting: int = 50, wait_timeout: float = 10.0, retry_after: int = 5):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+    
+    def saturated(self) -> bool:
+        """True when a new caller would be rejected without waiting."""
+        return self._semaphore.locked() and self.waiting >= self.max_waiting
+    
+    @asynccontextmanager
+    async def slot(self):
+        if self.saturated():
+            self.rejected += 1
+            raise OverloadedError("Too many requests waiting for the AI service", self.retry_after)
+        
+        if not self._semaphore.locked():
+            # A free slot is taken without yielding, so the counters stay exact
+            await self._semaphore.acquire()
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.wait_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise OverloadedError("Timed out waiting for the AI service", self.retry_after)
+            finally:
+                self.waiting -= 1
+        
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+class KeyedLock:
+    """
+    One asyncio.Lock per key, dropped again once nobody holds or waits for it.
+    
+    At most ``max_waiting`` callers wait behind the holder of a key, each for up to
+    ``wait_timeout`` seconds; beyond either, ``hold`` raises OverloadedError, so a
+    client repeating requests on one key is shed instead of piling up connections.
+    """
+    
+    def __init__(self, max_waiting: int = 1, wait_timeout: float = 10.0, retry_after: int = 5):
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self.waiting = 0
+        self.rejected = 0
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+    
+    def saturated(self, key: str) -> bool:
+        """True when a new caller for ``key`` would be rejected without waiting."""
+        _, users = self._locks.get(key, (None, 0))
+        return users > self.max_waiting
+    
+    @asynccontextmanager
+    async def hold(self, key: str):
+        if self.saturated(key):
+            self.rejected += 1
+            raise OverloadedError("A turn for this session is already running and another is waiting", self.retry_after)
+        
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            if not lock.locked():
+                await lock.acquire()
+            else:
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(lock.acquire(), timeout=self.wait_timeout)
+                except asyncio.TimeoutError:
+                    self.rejected += 1
+                    raise OverloadedError("Timed out waiting for the previous turn of this session", self.retry_after)
+                finally:
+                    self.waiting -= 1
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            lock, users = self._locks[key]
+            if users <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+    
+    def __len__(self) -> int:
+        return len(self._locks)
+    
+    async def aclose(self) -> None:
+        self._locks.clear()
+
+
+class RedisKeyedLock:
+    """
+    Per-key lock held in Redis, so one key is serialised across every worker process.
+    
+    The lock is redis-py's ``SET NX PX`` lock with a random token, extended while it is
+    held and released only by its holder; if the holder dies it expires after
+    ``lock_ttl`` seconds. Holders and waiters of a key are counted in a sorted set
+    scored by when each last checked in, so the ``max_waiting`` bound also holds across
+    processes and entries left by a dead process age out. Waiters poll for the lock.
+    """
+    
+    def __init__(
+        self,
+        url: str,
+        max_waiting: int = 1,
+        wait_timeout: float = 10.0,
+        retry_after: int = 5,
+        lock_ttl: float = 30.0,
+        poll_interval: float = 0.05
+    ):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.waiting = 0
+        self.rejected = 0
+        # Holders and waiters in this process, per key
+        self._local: Dict[str, int] = {}
+    
+    def saturated(self, key: str) -> bool:
+        """True when this process alone already has too many callers for ``key`` (other processes are checked in ``hold``)."""
+        return self._local.get(key, 0) > self.max_waiting
+    
+    async def _check_in(self, users_key: str, token: str) -> int:
+        """Record ``token`` as a live user of the key and return how many live users it has."""
+        now_ms = int(time.time() * 1000)
+        ttl_ms = int(self.lock_ttl * 1000)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(users_key, 0, now_ms - ttl_ms)
+            pipe.zadd(users_key, {token: now_ms})
+            pipe.zcard(users_key)
+            pipe.pexpire(users_key, ttl_ms)
+            _, _, users, _ = await pipe.execute()
+        return users
+    
+    async def _keep_alive(self, lock, users_key: str, token: str) -> None:
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            await lock.reacquire()
+            await self._check_in(users_key, token)
+    
+    @asynccontextmanager
+    async def hold(self, key: str):
+        if self.saturated(key):
+            self.rejected += 1
+            raise OverloadedError("A turn for this session is already running and another is waiting", self.retry_after)
+        
+        users_key = f"session-lock-users:{key}"
+        token = uuid.uuid4().hex
+        lock = self._redis.lock(f"session-lock:{key}", timeout=self.lock_ttl, sleep=self.poll_interval)
+        self._local[key] = self._local.get(key, 0) + 1
+        try:
+            if await self._check_in(users_key, token) > self.max_waiting + 1:
+                self.rejected += 1
+                raise OverloadedError("A turn for this session is already running and another is waiting", self.retry_after)
+            
+            if not await lock.acquire(blocking=False):
+                self.waiting += 1
+                try:
+                    deadline = time.monotonic() + self.wait_timeout
+                    while not await lock.acquire(blocking=False):
+                        if time.monotonic() >= deadline:
+                            self.rejected += 1
+                            raise OverloadedError("Timed out waiting for the previous turn of this session", self.retry_after)
+                        await asyncio.sleep(self.poll_interval)
+                        await self._check_in(users_key, token)
+                finally:
+                    self.waiting -= 1
+            
+            keep_alive = asyncio.create_task(self._keep_alive(lock, users_key, token))
+            try:
+                yield
+            finally:
+                keep_alive.cancel()
+                try:
+                    await lock.release()
+                except Exception as e:
+                    # Expired and possibly taken by another turn: it is no longer ours to release
+                    logger.warning(f"Session lock was lost before release: key={key}, error={str(e)}")
+        finally:
+            self._local[key] -= 1
+            if not self._local[key]:
+                del self._local[key]
+            await self._redis.zrem(users_key, token)
+    
+    def __len__(self) -> int:
+        return len(self._local)
+    
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+def create_session_lock(
+    backend: str = "memory",
+    url: Optional[str] = None,
+    max_waiting: int = 1,
+    wait_timeout: float = 10.0,
+    retry_after: int = 5,
+    lock_ttl: float = 30.0
+):
+    """Factory for the per-session turn lock: in-process, or in Redis alongside the Redis session store."""
+    if backend == "redis":
+        if not url:
+            raise ValueError("SESSION_URL (or CACHE_URL) is required for the redis session backend")
+        return RedisKeyedLock(url, max_waiting=max_waiting, wait_timeout=wait_timeout, retry_after=retry_after, lock_ttl=lock_ttl)
+    return KeyedLock(max_waiting=max_waiting, wait_timeout=wait_timeout, retry_after=retry_after)
+
+
+class RequestCoalescer:
+    """
+    Shares one execution between identical concurrent requests.
+    
+    The first caller for a key starts the work as a task; callers arriving while it
+    runs await the same task. The task is shielded, so a disconnecting caller does
+    not cancel the work for the others.
+    """
+    
+    def __init__(self):
+        self.coalesced = 0
+        self._in_flight: Dict[str, "asyncio.Task[Any]"] = {}
+    
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return ``(result, coalesced)`` where ``coalesced`` is True for followers."""
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+        
+        task = asyncio.ensure_future(factory())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), False
+    
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+    
+    def __len__(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,173 @@
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+# === Database Configuration ===
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Pool tuning (ignored in pgbouncer mode, where the external pooler owns the connections)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)
+
+
+def use_pgbouncer_mode(url: str) -> bool:
+    """Whether to run against a transaction-mode pooler (DB_PGBOUNCER, or inferred from Supabase's port 6543)."""
+    if os.getenv("DB_PGBOUNCER") is not None:
+        return env_flag("DB_PGBOUNCER")
+    return make_url(url).port == 6543
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Build create_engine keyword arguments for the configured pooling mode."""
+    if use_pgbouncer_mode(url):
+        # Transaction pooling hands each transaction a different server connection, so
+        # keep no idle connections locally and never rely on server-side prepared statements
+        options: Dict[str, Any] = {"poolclass": NullPool}
+        if is_async:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        return options
+    
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def pool_stats(db_engine) -> Optional[Dict[str, Any]]:
+    """Report connection pool utilisation for /health."""
+    if db_engine is None:
+        return None
+    
+    pool = db_engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    
+    capacity = pool.size() + DB_MAX_OVERFLOW
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # SQLAlchemy's counter starts at -pool_size and only turns positive once overflow connections exist
+        "overflow": max(0, pool.overflow()),
+        "utilization": round(pool.checkedout() / capacity, 3) if capacity else None,
+    }
+
+
+Base = declarative_base()
+
+
+def make_async_database_url(url: str) -> str:
+    """Rewrite a sync SQLAlchemy URL to its asyncio driver (asyncpg / aiosqlite)."""
+    url_obj = make_url(url)
+    backend = url_obj.get_backend_name()
+    if backend == "postgresql":
+        url_obj = url_obj.set(drivername="postgresql+asyncpg")
+        # asyncpg does not understand libpq's sslmode, it takes ssl instead
+        if "sslmode" in url_obj.query:
+            query = dict(url_obj.query)
+            query["ssl"] = query.pop("sslmode")
+            url_obj = url_obj.set(query=query)
+    elif backend == "sqlite":
+        url_obj = url_obj.set(drivername="sqlite+aiosqlite")
+    return url_obj.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    make_async_database_url(DATABASE_URL) if DATABASE_URL else None
+)
+
+# === Lazy engines ===
+# engine, SessionLocal, async_engine and AsyncSessionLocal are created on first access
+# (module __getattr__), since creating them imports the database drivers and dialects
+ENGINE_NAMES = ("engine", "SessionLocal", "async_engine", "AsyncSessionLocal")
+_engines_lock = threading.Lock()
+_engine_hooks: List[Callable[[Any, str], None]] = []
+
+
+def _run_engine_hook(hook: Callable[[Any, str], None], sync_engine, async_db_engine) -> None:
+    if sync_engine is not None:
+        hook(sync_engine, "sync")
+    if async_db_engine is not None:
+        hook(async_db_engine.sync_engine, "async")
+
+
+def add_engine_hook(hook: Callable[[Any, str], None]) -> None:
+    """Call ``hook(sync_engine, label)`` for each engine ("sync"/"async"), now or once they are created."""
+    with _engines_lock:
+        _engine_hooks.append(hook)
+        if engines_created():
+            _run_engine_hook(hook, *current_engines())
+
+
+def create_engines() -> None:
+    """Create both engines and their session factories, if not done yet (thread-safe)."""
+    if engines_created():
+        return
+    with _engines_lock:
+        if engines_created():
+            return
+        sync_engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL)) if DATABASE_URL else None
+        async_db_engine = create_async_engine(
+            ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True)
+        ) if ASYNC_DATABASE_URL else None
+        # Instrument before publishing, so no statement runs on an engine without its hooks
+        for hook in _engine_hooks:
+            _run_engine_hook(hook, sync_engine, async_db_engine)
+        
+        globals().update(
+            engine=sync_engine,
+            SessionLocal=sessionmaker(bind=sync_engine, autocommit=False, autoflush=False) if sync_engine else None,
+            async_engine=async_db_engine,
+            AsyncSessionLocal=async_sessionmaker(
+                bind=async_db_engine, autoflush=False, expire_on_commit=False
+            ) if async_db_engine else None,
+        )
+
+
+def engines_created() -> bool:
+    return "AsyncSessionLocal" in globals()
+
+
+def current_engines() -> Tuple[Optional[Any], Optional[Any]]:
+    """(engine, async_engine) if they have been created, without creating them."""
+    if not engines_created():
+        return None, None
+    return globals()["engine"], globals()["async_engine"]
+
+
+def __getattr__(name: str) -> Any:
+    if name in ENGINE_NAMES:
+        create_engines()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,122 @@
+import csv
+import io
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Sequence
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric
+
+# format -> (media type, file extension)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def require_pyarrow():
+    """Import pyarrow for the columnar formats, which are an optional install."""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise RuntimeError("Arrow and Parquet exports require the 'pyarrow' package") from e
+    return pyarrow
+
+
+def arrow_schema(columns: Sequence[Any]):
+    """Arrow schema matching the SQLAlchemy column expressions being exported."""
+    pa = require_pyarrow()
+    fields = []
+    for column in columns:
+        column_type = column.type
+        if isinstance(column_type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, (Float, Numeric)):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC" if column_type.timezone else None)
+        elif isinstance(column_type, Date):
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose buffered bytes are drained after every batch."""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def csv_chunks(names: List[str], partitions: AsyncIterator[Sequence[Sequence[Any]]]) -> AsyncIterator[bytes]:
+    """Header row, then one CSV chunk per partition of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    async for rows in partitions:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, (date, datetime)) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _record_batch(schema, rows: Sequence[Sequence[Any]]):
+    pa = require_pyarrow()
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+async def arrow_chunks(schema, partitions: AsyncIterator[Sequence[Sequence[Any]]]) -> AsyncIterator[bytes]:
+    """Arrow IPC stream: the schema, then one record batch per partition."""
+    pa = require_pyarrow()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+        yield sink.drain()
+        async for rows in partitions:
+            writer.write_batch(_record_batch(schema, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+async def parquet_chunks(schema, partitions: AsyncIterator[Sequence[Sequence[Any]]]) -> AsyncIterator[bytes]:
+    """Parquet file written one row group per partition."""
+    require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    sink = _ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd") as writer:
+        async for rows in partitions:
+            writer.write_batch(_record_batch(schema, rows))
+            yield sink.drain()
+    # The footer is only written on close
+    yield sink.drain()
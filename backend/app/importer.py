@@ -0,0 +1,177 @@
+"""
+Streaming CSV importer for the LoanApplication table.
+
+Reads the CSV in bounded batches, normalises columns against the ORM model,
+writes each batch with COPY and records progress in ``loan_import_checkpoint``
+in the same transaction, so an interrupted run resumes after the last
+committed batch. Rejected rows are appended to the rejects file only once their
+batch has committed, so a resumed run does not write them twice.
+
+Usage:
+    python -m app.importer synthetic_loan_data.csv [--batch-size 5000] [--rejects rejects.ndjson]
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from itertools import islice
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.database import Base, engine_options, make_async_database_url
+from app.ingest import insert_loans, validate_record
+from app.models import ImportCheckpoint, LoanApplication
+from app.scoring import score_records
+
+logger = logging.getLogger("app.importer")
+
+
+async def import_csv(
+    db_engine: AsyncEngine,
+    path: str,
+    source: Optional[str] = None,
+    batch_size: int = 5000,
+    restart: bool = False,
+    rejects_path: Optional[str] = None,
+    score: bool = True,
+    truncate: bool = False,
+) -> ImportCheckpoint:
+    """
+    Import ``path`` into LoanApplication, resuming from its checkpoint unless ``restart``.
+    
+    Restarting a source that already inserted rows would insert them again, so it raises
+    ValueError unless ``truncate``, which first empties the loan table and every checkpoint.
+    """
+    source = source or os.path.basename(path)
+    
+    async with db_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[LoanApplication.__table__, ImportCheckpoint.__table__])
+    
+    async with AsyncSession(db_engine, expire_on_commit=False) as db:
+        checkpoint = await db.get(ImportCheckpoint, source)
+        if restart and checkpoint is not None and checkpoint.rows_inserted and not truncate:
+            raise ValueError(
+                f"{source} already inserted {checkpoint.rows_inserted} rows; restarting would insert them again "
+                f"(pass --truncate to empty the loan table first)"
+            )
+        if truncate:
+            logger.warning("Emptying the loan table and all import checkpoints before importing")
+            await db.execute(delete(LoanApplication))
+            await db.execute(delete(ImportCheckpoint))
+            checkpoint = None
+        if checkpoint is None or restart:
+            checkpoint = await db.merge(ImportCheckpoint(source=source, rows_done=0, rows_inserted=0, rows_rejected=0))
+            await db.commit()
+        elif checkpoint.rows_done:
+            logger.info(f"Resuming {source} after row {checkpoint.rows_done}")
+        
+        rejects = open(rejects_path, "a", encoding="utf-8") if rejects_path else None
+        start_time = time.time()
+        start_rows = checkpoint.rows_done
+        
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as csv_file:
+                reader = csv.DictReader(csv_file)
+                # Skip rows already committed by a previous run
+                for _ in islice(reader, checkpoint.rows_done):
+                    pass
+                
+                while True:
+                    chunk = list(islice(reader, batch_size))
+                    if not chunk:
+                        break
+                    
+                    rows = []
+                    rejected = []
+                    for offset, raw in enumerate(chunk):
+                        row, errors = validate_record(raw)
+                        if errors:
+                            checkpoint.rows_rejected += 1
+                            rejected.append(json.dumps({"row": checkpoint.rows_done + offset, "errors": errors, "data": raw}) + "\n")
+                        else:
+                            rows.append(row)
+                    
+                    if score:
+                        score_records(rows)
+                    ids = await insert_loans(db, rows)
+                    checkpoint.rows_inserted += len(ids)
+                    checkpoint.rows_done += len(chunk)
+                    await db.commit()
+                    # Only after the commit: a batch that is rolled back is read again on resume
+                    if rejects and rejected:
+                        rejects.writelines(rejected)
+                        rejects.flush()
+                    
+                    elapsed = time.time() - start_time
+                    rate = (checkpoint.rows_done - start_rows) / elapsed if elapsed else 0.0
+                    logger.info(
+                        f"{source}: rows_done={checkpoint.rows_done}, inserted={checkpoint.rows_inserted}, "
+                        f"rejected={checkpoint.rows_rejected}, rows_per_sec={rate:.0f}"
+                    )
+        finally:
+            if rejects:
+                rejects.close()
+        
+        elapsed = time.time() - start_time
+        rate = (checkpoint.rows_done - start_rows) / elapsed if elapsed else 0.0
+        logger.info(
+            f"Import of {source} complete: rows={checkpoint.rows_done}, inserted={checkpoint.rows_inserted}, "
+            f"rejected={checkpoint.rows_rejected}, elapsed={elapsed:.1f}s, rows_per_sec={rate:.0f}"
+        )
+        return checkpoint
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import loan applications from a CSV file.")
+    parser.add_argument("path", help="CSV file to import")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), help="Defaults to $DATABASE_URL")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per COPY/commit (default 5000)")
+    parser.add_argument("--source", help="Checkpoint key, defaults to the file name")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and import from the first row")
+    parser.add_argument(
+        "--truncate", action="store_true",
+        help="Delete every loan application and import checkpoint first (required to --restart a source that inserted rows)"
+    )
+    parser.add_argument("--rejects", help="Append rows that fail validation to this NDJSON file")
+    parser.add_argument("--no-score", action="store_true", help="Keep the file's risk scores instead of computing them")
+    args = parser.parse_args(argv)
+    
+    if not args.database_url:
+        parser.error("DATABASE_URL is not set and --database-url was not given")
+    
+    async def run():
+        url = make_async_database_url(args.database_url)
+        db_engine = create_async_engine(url, **engine_options(url, is_async=True))
+        try:
+            await import_csv(
+                db_engine,
+                args.path,
+                source=args.source,
+                batch_size=args.batch_size,
+                restart=args.restart,
+                rejects_path=args.rejects,
+                score=not args.no_score,
+                truncate=args.truncate,
+            )
+        finally:
+            await db_engine.dispose()
+    
+    try:
+        asyncio.run(run())
+    except ValueError as e:
+        parser.error(str(e))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(main())
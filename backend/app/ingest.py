@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import Numeric, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import LoanApplication, LOAN_COLUMNS
+from app.scoring import score_records
+from app.schemas.loan import LoanApplicationCreate, BulkLoanResult, BulkLoanRowError
+
+logger = logging.getLogger(__name__)
+
+# Columns written on ingest; ids are always assigned by the database sequence
+INGEST_COLUMNS = [name for name in LOAN_COLUMNS if name != "id"]
+NUMERIC_COLUMNS = {
+    name for name, column in LOAN_COLUMNS.items() if isinstance(column.type, Numeric)
+}
+
+JSON_CONTENT_TYPES = {"application/json"}
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_CONTENT_TYPES = {"text/csv", "application/csv"}
+
+
+def normalise_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Map incoming column names onto LoanApplication columns (case/whitespace-insensitive)."""
+    record = {}
+    for key, value in raw.items():
+        name = str(key).strip().lower()
+        if name not in INGEST_COLUMNS:
+            continue
+        # CSV has no null, an empty cell means "not provided"
+        if isinstance(value, str) and value.strip() == "":
+            value = None
+        record[name] = value
+    return record
+
+
+def iter_csv_records(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield CSV rows as dicts keyed by header."""
+    yield from csv.DictReader(lines)
+
+
+def iter_ndjson_records(lines: Iterable[str]) -> Iterator[Any]:
+    """Yield one decoded JSON value per non-blank line (the decode error itself for malformed lines)."""
+    for line in lines:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield e
+
+
+def iter_body_records(body: bytes, content_type: str) -> Iterator[Any]:
+    """Decode a request body as a JSON array, NDJSON or CSV, depending on its content type."""
+    if content_type in JSON_CONTENT_TYPES:
+        data = json.loads(body)
+        if not isinstance(data, list):
+            raise ValueError("JSON body must be an array of loan applications")
+        return iter(data)
+    
+    lines = io.StringIO(body.decode("utf-8-sig"), newline="")
+    if content_type in NDJSON_CONTENT_TYPES:
+        return iter_ndjson_records(lines)
+    if content_type in CSV_CONTENT_TYPES:
+        return iter_csv_records(lines)
+    
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+
+def validate_record(raw: Any) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Validate one raw record, returning (row, []) on success or (None, errors)."""
+    if isinstance(raw, Exception):
+        return None, [{"field": None, "message": f"Malformed row: {raw}"}]
+    if not isinstance(raw, dict):
+        return None, [{"field": None, "message": "Row must be an object"}]
+    try:
+        application = LoanApplicationCreate(**normalise_record(raw))
+    except ValidationError as e:
+        return None, [
+            {"field": ".".join(str(part) for part in err["loc"]), "message": err["msg"]}
+            for err in e.errors()
+        ]
+    return application.dict(), []
+
+
+def to_copy_record(row: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Order a validated row by INGEST_COLUMNS, with Numeric columns as Decimal for the COPY codec."""
+    return tuple(
+        Decimal(str(row[name])) if name in NUMERIC_COLUMNS and row.get(name) is not None else row.get(name)
+        for name in INGEST_COLUMNS
+    )
+
+
+async def insert_loans(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert validated rows and return their ids, in order.
+    
+    On Postgres the ids are reserved from the table's sequence up front and the rows
+    are streamed with COPY; other databases fall back to a multi-row INSERT.
+    """
+    if not rows:
+        return []
+    
+    connection = await db.connection()
+    if connection.dialect.name == "postgresql":
+        table_name = LoanApplication.__tablename__
+        sequence = (await db.execute(
+            text("SELECT pg_get_serial_sequence(:table, 'id')"),
+            {"table": f'"{table_name}"'}
+        )).scalar()
+        
+        if sequence:
+            ids = (await db.execute(
+                text("SELECT nextval(CAST(:sequence AS regclass)) FROM generate_series(1, :count)"),
+                {"sequence": sequence, "count": len(rows)}
+            )).scalars().all()
+            
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                table_name,
+                records=[(loan_id, *to_copy_record(row)) for loan_id, row in zip(ids, rows)],
+                columns=["id", *INGEST_COLUMNS],
+            )
+            return list(ids)
+        
+        logger.warning(f"No sequence found for {table_name}.id, falling back to INSERT")
+    
+    result = await db.execute(insert(LoanApplication).returning(LoanApplication.id), rows)
+    return list(result.scalars().all())
+
+
+async def ingest_records(
+    db: AsyncSession,
+    records: Iterable[Any],
+    batch_size: int = 1000,
+    start_row: int = 0,
+    score: bool = False
+) -> BulkLoanResult:
+    """
+    Validate and insert records in batches, committing after each batch.
+    
+    Invalid rows are skipped and reported with their 0-based position in ``records``
+    (offset by ``start_row``); valid rows are inserted and their ids returned.
+    A batch the database rejects (e.g. a constraint violation) is rolled back and
+    its rows reported as errors, so the ids of every committed batch are always
+    returned and a client can resubmit just the failed rows.
+    With ``score`` each batch is risk-scored before it is written.
+    """
+    ids: List[int] = []
+    errors: List[BulkLoanRowError] = []
+    batch: List[Dict[str, Any]] = []
+    batch_rows: List[int] = []
+    
+    async def flush():
+        if not batch:
+            return
+        if score:
+            score_records(batch)
+        try:
+            batch_ids = await insert_loans(db, batch)
+            await db.commit()
+        except Exception as e:
+            # COPY goes through the raw driver connection, so its errors are not wrapped as DBAPIError
+            logger.warning(f"Bulk ingest batch rejected: rows={batch_rows[0]}..{batch_rows[-1]}, error={str(e)}")
+            try:
+                await db.rollback()
+            except Exception as rollback_error:
+                logger.error(f"Rollback after a rejected batch failed: {str(rollback_error)}")
+            message = f"Batch of rows {batch_rows[0]}-{batch_rows[-1]} rejected by the database: {str(e)}"
+            errors.extend(BulkLoanRowError(row=index, errors=[{"field": None, "message": message}]) for index in batch_rows)
+        else:
+            ids.extend(batch_ids)
+        batch.clear()
+        batch_rows.clear()
+    
+    for index, raw in enumerate(records, start=start_row):
+        row, row_errors = validate_record(raw)
+        if row_errors:
+            errors.append(BulkLoanRowError(row=index, errors=row_errors))
+            continue
+        
+        batch.append(row)
+        batch_rows.append(index)
+        if len(batch) >= batch_size:
+            await flush()
+    
+    await flush()
+    
+    errors.sort(key=lambda error: error.row)
+    return BulkLoanResult(inserted=len(ids), ids=ids, errors=errors)
@@ -0,0 +1,137 @@
+import re
+from typing import Any, Dict, Optional, Tuple
+
+# Longer messages are left to the agent, which can weigh everything else they say
+MAX_INTENT_CHARS = 200
+
+_LOAN_REF = r"loan(?:\s+application)?\s*(?:#|no\.?\s*|number\s+|id\s+)?(\d{1,9})"
+_END = r"\s*[?.!]*$"
+
+# "show loan 42", "look up loan #42", "what is loan 42?", "loan 42"
+LOOKUP_PATTERN = re.compile(
+    r"^(?:please\s+)?"
+    r"(?:(?:show|get|look\s*up|read|find|fetch|display|open|pull\s+up)\s+(?:me\s+)?|what(?:'s|\s+is)\s+)?"
+    r"(?:the\s+)?" + _LOAN_REF + _END,
+    re.IGNORECASE
+)
+
+# "what rate would loan 42 get?", "quote a rate for loan 42"
+LOAN_RATE_PATTERNS = (
+    re.compile(
+        r"^(?:what|which)\s+(?:interest\s+)?rate\s+(?:would|will|does|could|can|should)\s+(?:the\s+)?" + _LOAN_REF
+        + r"\s+(?:get|have|receive|qualify\s+for)" + _END,
+        re.IGNORECASE
+    ),
+    re.compile(
+        r"^(?:please\s+)?(?:quote|price|calculate|get)\s+(?:me\s+)?(?:an?\s+|the\s+)?(?:interest\s+)?rate\s+for\s+(?:the\s+)?"
+        + _LOAN_REF + _END,
+        re.IGNORECASE
+    ),
+)
+
+_AMOUNT = r"\$?\s*(\d[\d,]*(?:\.\d+)?\s*[km]?)\b"
+
+# A plainly structured quote request and nothing else, e.g.
+# "what rate for a $20k loan over 36 months on a $50k income?" or
+# "quote me a rate for a 200k loan for 30 years with an annual income of 90k".
+# Anchored at both ends, so conversational or multi-clause messages, per-month incomes
+# and anything with extra conditions go to the agent instead
+_QUOTE_PREFIX = (
+    r"^(?:please\s+)?"
+    r"(?:what(?:'s|\s+is|\s+would\s+be)?\s+(?:the\s+|my\s+)?|(?:quote|price|calculate|get)\s+(?:me\s+)?(?:an?\s+|the\s+)?)?"
+    r"(?:interest\s+)?rate\s+(?:would\s+i\s+get\s+|do\s+i\s+get\s+|can\s+i\s+get\s+)?(?:for|on)\s+"
+)
+_QUOTE_LOAN = r"(?:an?\s+)?" + _AMOUNT + r"\s+loan"
+_QUOTE_TERM = r"(?:over|for)\s+(\d{1,3})[\s-]*(months?|years?)"
+_QUOTE_INCOME = (
+    r"(?:on|with)\s+(?:an?\s+)?(?:"
+    r"(?:annual\s+|yearly\s+)?income\s+of\s+" + _AMOUNT + r"(?:\s+(?:a|per)\s+year)?"
+    r"|" + _AMOUNT + r"\s+(?:annual\s+|yearly\s+)?income"
+    r")"
+)
+QUOTE_PATTERNS = (
+    # (pattern, loan amount group, income groups, term group)
+    (re.compile(_QUOTE_PREFIX + _QUOTE_LOAN + r"\s+" + _QUOTE_TERM + r"\s+" + _QUOTE_INCOME + _END, re.IGNORECASE), 1, (4, 5), 2),
+    (re.compile(_QUOTE_PREFIX + _QUOTE_LOAN + r"\s+" + _QUOTE_INCOME + r"\s+" + _QUOTE_TERM + _END, re.IGNORECASE), 1, (2, 3), 4),
+)
+
+
+def parse_amount(text: str) -> float:
+    """``"$50,000"``, ``"50k"`` or ``"1.2m"`` as a number."""
+    text = text.replace(",", "").replace(" ", "").lower()
+    multiplier = 1
+    if text.endswith("k"):
+        multiplier, text = 1000, text[:-1]
+    elif text.endswith("m"):
+        multiplier, text = 1000000, text[:-1]
+    return float(text) * multiplier
+
+
+def match_intent(text: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Recognise a message the backend can answer without the agent.
+    
+    Returns ``("loan_lookup", {"loan_id"})``, ``("loan_rate", {"loan_id"})``,
+    ``("rate_quote", {"income", "loan_amount", "duration"})`` or None.
+    """
+    text = " ".join(text.split())
+    if not text or len(text) > MAX_INTENT_CHARS:
+        return None
+    
+    match = LOOKUP_PATTERN.match(text)
+    if match:
+        return "loan_lookup", {"loan_id": int(match.group(1))}
+    
+    for pattern in LOAN_RATE_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            return "loan_rate", {"loan_id": int(match.group(1))}
+    
+    for pattern, loan_group, income_groups, term_group in QUOTE_PATTERNS:
+        match = pattern.match(text)
+        if not match:
+            continue
+        income = parse_amount(next(match.group(group) for group in income_groups if match.group(group)))
+        loan_amount = parse_amount(match.group(loan_group))
+        months = int(match.group(term_group)) * (12 if match.group(term_group + 1).lower().startswith("y") else 1)
+        if income <= 0 or loan_amount <= 0 or months <= 0:
+            return None
+        return "rate_quote", {"income": income, "loan_amount": loan_amount, "duration": months}
+    return None
+
+
+def _money(value: Any) -> str:
+    return f"${float(value):,.2f}" if value is not None else "unknown"
+
+
+def _percent(fraction: Any) -> str:
+    # Stored rates are fractions (0.137), like baseinterestrate
+    return f"{float(fraction) * 100:.2f}%" if fraction is not None else "unknown"
+
+
+def describe_loan(loan: Dict[str, Any]) -> str:
+    """Plain-text summary of a loan application, as returned by GET /loans/{loan_id}."""
+    status = "approved" if loan.get("loanapproved") else "not approved"
+    parts = [
+        f"Loan {loan['id']}: {_money(loan.get('loanamount'))} over {loan.get('loanduration')} months"
+        f" for {loan.get('loanpurpose') or 'an unspecified purpose'}, applied {loan.get('applicationdate')}, {status}.",
+        f"Applicant: age {loan.get('age')}, {loan.get('employmentstatus')}, annual income {_money(loan.get('annualincome'))},"
+        f" credit score {loan.get('creditscore')}.",
+        f"Interest rate {_percent(loan.get('interestrate'))}, monthly payment {_money(loan.get('monthlyloanpayment'))},"
+        f" debt-to-income ratio {loan.get('debttoincomeratio')}, risk score {loan.get('riskscore')}.",
+    ]
+    return " ".join(parts)
+
+
+def describe_loan_rate(loan_id: int, rate: float, payment: float) -> str:
+    """Plain-text rate of a stored loan, as priced when it was scored (``rate`` in percent)."""
+    return f"Loan {loan_id} is priced at an interest rate of {rate:.2f}%, a monthly payment of {_money(payment)}."
+
+
+def describe_quote(income: float, loan_amount: float, duration: int, rate: float, payment: float) -> str:
+    """Plain-text rate quote."""
+    return (
+        f"Estimated interest rate for a {_money(loan_amount)} loan over {duration} months on an annual income of"
+        f" {_money(income)}: {rate:.2f}%, a monthly payment of about {_money(payment)}."
+        " This is a preliminary estimate, not an offer."
+    )
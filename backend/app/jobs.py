@@ -0,0 +1,439 @@
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.clients.resilience import backoff_delay
+from app.concurrency import OverloadedError
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobFailed(Exception):
+    """Raised by a job to fail with a structured error instead of the exception message."""
+    
+    def __init__(self, error: Dict[str, Any]):
+        super().__init__(error.get("detail", "Job failed"))
+        self.error = error
+
+
+class Job:
+    """One queued unit of work and, once finished, its outcome."""
+    
+    def __init__(self, payload: Dict[str, Any], webhook_url: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[Dict[str, Any]] = None
+        self.webhook_url = webhook_url
+        self.webhook: Optional[Dict[str, Any]] = None
+        # Everything the handler needs to run the job, so any worker process can pick it up
+        self.payload: Optional[Dict[str, Any]] = payload
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "webhook": self.webhook,
+        }
+    
+    def dump(self) -> str:
+        return json.dumps({**self.to_dict(), "webhook_url": self.webhook_url, "payload": self.payload})
+    
+    @classmethod
+    def load(cls, data: str) -> "Job":
+        fields = json.loads(data)
+        job = cls(fields.pop("payload"), fields.pop("webhook_url"))
+        job.id = fields.pop("job_id")
+        job.__dict__.update(fields)
+        return job
+
+
+class MemoryJobStore:
+    """Jobs and their queue kept in this process: only this worker can run or report them."""
+    
+    shared = False
+    
+    def __init__(self, max_pending: int = 100, result_ttl: float = 3600.0):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_pending)
+    
+    async def push(self, job: Job) -> bool:
+        """Store and queue ``job``; False when ``max_pending`` jobs are already waiting."""
+        self._prune()
+        try:
+            self._queue.put_nowait(job.id)
+        except asyncio.QueueFull:
+            return False
+        self._jobs[job.id] = job
+        return True
+    
+    async def pop(self, timeout: float) -> Optional[Job]:
+        """The next queued job, or None once ``timeout`` seconds pass without one (0 means don't wait)."""
+        try:
+            if timeout <= 0:
+                job_id = self._queue.get_nowait()
+            else:
+                job_id = await asyncio.wait_for(self._queue.get(), timeout)
+        except (asyncio.QueueEmpty, asyncio.TimeoutError):
+            return None
+        return self._jobs.get(job_id)
+    
+    async def save(self, job: Job) -> None:
+        # Jobs are stored by reference, so there is nothing to write back
+        pass
+    
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.finished and job.finished_at + self.result_ttl < time.time():
+            return None
+        return job
+    
+    def _prune(self) -> None:
+        # Jobs are stored in submission order, so expired ones cluster at the front
+        cutoff = time.time() - self.result_ttl
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if not job.finished or job.finished_at >= cutoff:
+                break
+            self._jobs.popitem(last=False)
+    
+    def queued(self) -> Optional[int]:
+        return self._queue.qsize()
+    
+    def size(self) -> Optional[int]:
+        return len(self._jobs)
+    
+    async def aclose(self) -> None:
+        self._jobs.clear()
+
+
+class RedisJobStore:
+    """
+    Jobs kept in Redis: one key per job and a shared list of queued job ids, so a job
+    submitted to one worker process can be run by any of them and polled from all.
+    """
+    
+    shared = True
+    QUEUE_KEY = "jobs:queue"
+    
+    def __init__(self, url: str, max_pending: int = 100, result_ttl: float = 3600.0):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("JOBS_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+    
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"job:{job_id}"
+    
+    async def push(self, job: Job) -> bool:
+        # Workers may briefly overshoot max_pending between the length check and the push
+        if await self._redis.llen(self.QUEUE_KEY) >= self.max_pending:
+            return False
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(job.id), job.dump(), ex=int(self.result_ttl))
+            pipe.rpush(self.QUEUE_KEY, job.id)
+            await pipe.execute()
+        return True
+    
+    async def pop(self, timeout: float) -> Optional[Job]:
+        if timeout <= 0:
+            job_id = await self._redis.lpop(self.QUEUE_KEY)
+        else:
+            item = await self._redis.blpop([self.QUEUE_KEY], timeout=timeout)
+            job_id = item[1] if item else None
+        return await self.get(job_id) if job_id else None
+    
+    async def save(self, job: Job) -> None:
+        await self._redis.set(self._key(job.id), job.dump(), ex=int(self.result_ttl))
+    
+    async def get(self, job_id: str) -> Optional[Job]:
+        data = await self._redis.get(self._key(job_id))
+        return Job.load(data) if data else None
+    
+    def queued(self) -> Optional[int]:
+        return None
+    
+    def size(self) -> Optional[int]:
+        return None
+    
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+def create_job_store(
+    backend: str = "memory",
+    url: Optional[str] = None,
+    max_pending: int = 100,
+    result_ttl: float = 3600.0
+):
+    """Factory function to create the store background jobs are queued in."""
+    if backend == "memory":
+        return MemoryJobStore(max_pending=max_pending, result_ttl=result_ttl)
+    if backend == "redis":
+        if not url:
+            raise ValueError("JOBS_URL (or CACHE_URL) is required for the redis jobs backend")
+        return RedisJobStore(url, max_pending=max_pending, result_ttl=result_ttl)
+    raise ValueError(f"Unknown jobs backend: {backend}")
+
+
+def host_allowed(host: str, allowed_hosts: List[str]) -> bool:
+    """Whether ``host`` is listed; an entry starting with a dot also matches any subdomain."""
+    host = host.lower().rstrip(".")
+    for entry in allowed_hosts:
+        entry = entry.lower().rstrip(".")
+        if host == entry.lstrip(".") or (entry.startswith(".") and host.endswith(entry)):
+            return True
+    return False
+
+
+async def check_webhook_url(url: str, allowed_hosts: Optional[List[str]] = None) -> None:
+    """
+    Raise ValueError unless ``url`` is http(s), its host is in ``allowed_hosts`` (when
+    given) and every address the host resolves to is public, so webhooks cannot be
+    pointed at loopback, private, link-local or other internal addresses.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("Webhook URL must be an http or https URL")
+    if allowed_hosts and not host_allowed(host, allowed_hosts):
+        raise ValueError(f"Webhook host {host} is not allowed")
+    
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        raise ValueError(f"Webhook host {host} does not resolve")
+    for _, _, _, _, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"Webhook host {host} resolves to a non-public address")
+
+
+class JobQueue:
+    """
+    Job queue drained by a fixed pool of asyncio workers per process.
+    
+    ``submit`` returns immediately; callers poll ``get`` or receive the finished
+    job as a webhook POST (signed with HMAC-SHA256 when ``webhook_secret`` is
+    set). Jobs live in ``store``: in-process by default, or shared through Redis
+    so that every worker process runs from, and reports on, the same queue. Once
+    ``store.max_pending`` jobs are waiting, submissions are rejected with
+    OverloadedError.
+    """
+    
+    def __init__(
+        self,
+        store=None,
+        max_workers: int = 4,
+        retry_after: int = 5,
+        drain_timeout: float = 30.0,
+        webhook_secret: Optional[str] = None,
+        webhook_timeout: float = 10.0,
+        webhook_retries: int = 3,
+        webhook_allowed_hosts: Optional[List[str]] = None
+    ):
+        self.store = store if store is not None else MemoryJobStore()
+        self.max_workers = max_workers
+        self.retry_after = retry_after
+        self.drain_timeout = drain_timeout
+        self.webhook_secret = webhook_secret
+        self.webhook_timeout = webhook_timeout
+        self.webhook_retries = webhook_retries
+        self.webhook_allowed_hosts = webhook_allowed_hosts
+        self.running = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+        self._handler: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None
+        self._accepting = False
+        self._draining = False
+        self._workers: List[asyncio.Task] = []
+        self._webhooks: set = set()
+        self._http: Optional[httpx.AsyncClient] = None
+    
+    def start(self, handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> None:
+        """Start the workers on the running event loop; ``handler(payload)`` returns a job's result."""
+        self._handler = handler
+        self._accepting = True
+        self._draining = False
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+    
+    async def submit(self, payload: Dict[str, Any], webhook_url: Optional[str] = None) -> Job:
+        """
+        Queue a job whose result is ``handler(payload)``; ``payload`` must be JSON-serialisable.
+        Raises ValueError for a webhook URL that fails ``check_webhook_url``.
+        """
+        if not self._accepting:
+            raise RuntimeError("Job queue is not running")
+        if webhook_url:
+            await check_webhook_url(webhook_url, self.webhook_allowed_hosts)
+        
+        job = Job(payload, webhook_url)
+        if not await self.store.push(job):
+            self.rejected += 1
+            raise OverloadedError("Too many jobs waiting to run", self.retry_after)
+        return job
+    
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self.store.get(job_id)
+    
+    async def _worker(self) -> None:
+        while True:
+            if self._draining and self.store.shared:
+                # Queued jobs stay in the shared store for the other processes
+                return
+            job = await self.store.pop(0 if self._draining else 1.0)
+            if job is None:
+                if self._draining:
+                    return
+                continue
+            await self._execute(job)
+    
+    async def _execute(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        self.running += 1
+        try:
+            await self.store.save(job)
+            job.result = await self._handler(job.payload)
+            job.status = SUCCEEDED
+            self.succeeded += 1
+        except asyncio.CancelledError:
+            job.error = {"detail": "Interrupted by shutdown before finishing", "code": "INTERRUPTED"}
+            job.status = FAILED
+            self.failed += 1
+            raise
+        except Exception as e:
+            job.error = e.error if isinstance(e, JobFailed) else {"detail": str(e), "code": "JOB_FAILED"}
+            job.status = FAILED
+            self.failed += 1
+            logger.warning(f"Job failed: job_id={job.id}, error={str(e)}")
+        finally:
+            self.running -= 1
+            job.finished_at = time.time()
+            job.payload = None
+            await self.store.save(job)
+        
+        if job.webhook_url:
+            # Delivery (and its retries) must not hold up the next job
+            task = asyncio.create_task(self._deliver(job))
+            self._webhooks.add(task)
+            task.add_done_callback(self._webhooks.discard)
+    
+    def _signature(self, body: bytes) -> Dict[str, str]:
+        if not self.webhook_secret:
+            return {}
+        digest = hmac.new(self.webhook_secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        return {"X-Signature-256": f"sha256={digest}"}
+    
+    async def _deliver(self, job: Job) -> None:
+        """POST the finished job to its webhook, retrying network errors and 5xx replies."""
+        body = json.dumps({key: value for key, value in job.to_dict().items() if key != "webhook"}).encode("utf-8")
+        headers = {"Content-Type": "application/json", "X-Job-ID": job.id, **self._signature(body)}
+        job.webhook = {"delivered": False, "attempts": 0, "status_code": None}
+        # Created on first delivery: building the client (and its TLS context) is slow enough to show in startup time.
+        # Redirects are not followed, so a checked URL cannot bounce the request to an internal address.
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=self.webhook_timeout, follow_redirects=False)
+        
+        try:
+            for attempt in range(self.webhook_retries + 1):
+                try:
+                    # Checked again before every attempt: the host may resolve differently than at submission
+                    await check_webhook_url(job.webhook_url, self.webhook_allowed_hosts)
+                except ValueError as e:
+                    job.webhook["error"] = str(e)
+                    logger.warning(f"Webhook not delivered: job_id={job.id}, error={str(e)}")
+                    return
+                job.webhook["attempts"] = attempt + 1
+                try:
+                    response = await self._http.post(job.webhook_url, content=body, headers=headers)
+                    job.webhook["status_code"] = response.status_code
+                    if response.status_code < 500:
+                        job.webhook["delivered"] = response.is_success
+                        return
+                except httpx.HTTPError as e:
+                    logger.warning(f"Webhook delivery failed: job_id={job.id}, attempt={attempt + 1}, error={str(e)}")
+                if attempt < self.webhook_retries:
+                    await asyncio.sleep(backoff_delay(attempt, 1.0, 30.0))
+        finally:
+            await self.store.save(job)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.store).__name__,
+            "workers": self.max_workers,
+            "accepting": self._accepting,
+            "queued": self.store.queued(),
+            "running": self.running,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "stored": self.store.size(),
+        }
+    
+    async def aclose(self) -> None:
+        """
+        Stop accepting jobs and drain: running jobs (and, for an in-process store, queued
+        ones) get up to ``drain_timeout`` seconds to finish, with their webhooks, before
+        being cancelled. Jobs queued in a shared store are left for the other processes.
+        """
+        self._accepting = False
+        self._draining = True
+        deadline = time.monotonic() + self.drain_timeout
+        if self._workers:
+            await asyncio.wait(self._workers, timeout=self.drain_timeout)
+        if self._webhooks:
+            await asyncio.wait(list(self._webhooks), timeout=max(0.0, deadline - time.monotonic()))
+        
+        unfinished = [task for task in self._workers + list(self._webhooks) if not task.done()]
+        if unfinished or self.store.queued():
+            logger.warning(
+                f"Job queue drain timed out: cancelling {len(unfinished)} tasks, "
+                f"dropping {self.store.queued() or 0} queued jobs"
+            )
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._webhooks, return_exceptions=True)
+        self._workers = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        await self.store.aclose()
@@ -1,22 +1,83 @@
+# Imported first, so the startup report's "import" phase covers everything below
+from app.startup import startup, PENDING, READY, UNAVAILABLE, DISABLED
+
 import os
+import json
+import asyncio
 import uuid
 import time
 import logging
-from contextlib import asynccontextmanager
-from typing import Optional, List
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from typing import Optional, List, Dict, Any, Tuple
 from dotenv import load_dotenv
 from datetime import date
 
-from fastapi import FastAPI, HTTPException, Request, Depends, Query, Path
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, Query, Path
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Date, Numeric
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from fastapi.responses import JSONResponse, StreamingResponse
+from opentelemetry import trace
+from sqlalchemy import select, cast, func, Float, Numeric
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.chat import ChatRequest, ChatResponse, ChatError, ErrorDetail
-from app.clients.langflow_client import create_langflow_client, LangFlowClient
+from app import database
+from app.database import env_flag, pool_stats, current_engines
+from app.models import LoanApplication, LOAN_COLUMNS
+from app.responses import ORJSONResponse
+from app.export import EXPORT_FORMATS, arrow_schema, csv_chunks, arrow_chunks, parquet_chunks
+from app.analytics import (
+    MEASURE_COLUMNS,
+    REFRESH_ROLLUP_SQL,
+    ROLLUP_VIEW,
+    aggregate_statement,
+    histogram_groups,
+    histogram_statement,
+    parse_group_by,
+    parse_metrics,
+)
+from app.schemas.chat import ChatMessage, ChatRequest, ChatResponse, ChatError, ErrorDetail
+from app.schemas.loan import LoanApplicationCreate, LoanApplicationRead, BulkLoanResult
+from app.schemas.pricing import RateBatchRequest, RateBatchResponse
+from app.schemas.tools import ToolBatchRequest, ToolBatchResponse, ToolResult
+from app.schemas.jobs import ChatJobRequest, ChatJob
+from app import pricing
+from app.intents import match_intent, describe_loan, describe_loan_rate, describe_quote
+from app.scoring import score_records
+from app.cache import create_response_cache
+from app.sessions import create_session_store, build_context_window
+from app.concurrency import ConcurrencyGate, RequestCoalescer, OverloadedError, create_session_lock
+from app.jobs import JobQueue, JobFailed, create_job_store
+from app.metrics import (
+    REGISTRY,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    HTTP_REQUESTS,
+    HTTP_LATENCY,
+    HTTP_IN_FLIGHT,
+    LANGFLOW_LATENCY,
+    LANGFLOW_ERRORS,
+    AGENT_FAST_PATH_TURNS,
+    MultiProcessMetrics,
+    instrument_engine,
+    gauge_family,
+    counter_family,
+)
+from app.tracing import (
+    tracer,
+    configure_tracing,
+    shutdown_tracing,
+    extract_trace_context,
+    trace_engine,
+)
+from app.clients.langflow_client import create_langflow_client, LangFlowClient, DEFAULT_OUTPUT_PATH
+from app.clients.resilience import CircuitOpenError, backoff_delay
+from app.ingest import (
+    iter_body_records,
+    ingest_records,
+    JSON_CONTENT_TYPES,
+    NDJSON_CONTENT_TYPES,
+    CSV_CONTENT_TYPES,
+)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -28,130 +89,253 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# === Database Configuration ===
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL) if DATABASE_URL else None
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False) if engine else None
-Base = declarative_base()
-
-# === SQLAlchemy ORM Models ===
-class LoanApplication(Base):
-    __tablename__ = "LoanApplication"
-
-    id = Column(Integer, primary_key=True, index=True)
-    applicationdate = Column(Date)
-    age = Column(Integer)
-    annualincome = Column(Numeric(12, 2))
-    creditscore = Column(Numeric(5, 2))
-    employmentstatus = Column(String)
-    educationlevel = Column(String)
-    experience = Column(Integer)
-    loanamount = Column(Numeric(12, 2))
-    loanduration = Column(Integer)
-    maritalstatus = Column(String)
-    numberofdependents = Column(Integer)
-    homeownershipstatus = Column(String)
-    monthlydebtpayments = Column(Numeric(12, 2))
-    creditcardutilizationrate = Column(Numeric(5, 4))
-    numberofopencreditlines = Column(Integer)
-    numberofcreditinquiries = Column(Integer)
-    debttoincomeratio = Column(Numeric(5, 4))
-    bankruptcyhistory = Column(Boolean)
-    loanpurpose = Column(String)
-    previousloandefaults = Column(Boolean)
-    paymenthistory = Column(String)
-    lengthofcredithistory = Column(Integer)
-    savingsaccountbalance = Column(Numeric(12, 2))
-    checkingaccountbalance = Column(Numeric(12, 2))
-    totalassets = Column(Numeric(14, 2))
-    totalliabilities = Column(Numeric(14, 2))
-    monthlyincome = Column(Numeric(12, 2))
-    utilitybillspaymenthistory = Column(String)
-    jobtenure = Column(Integer)
-    networth = Column(Numeric(14, 2))
-    baseinterestrate = Column(Numeric(5, 3))
-    interestrate = Column(Numeric(5, 3))
-    monthlyloanpayment = Column(Numeric(12, 2))
-    totaldebttoincomeratio = Column(Numeric(5, 4))
-    loanapproved = Column(Boolean)
-    riskscore = Column(Numeric(5, 2))
-
-# === Pydantic Models for Database Operations ===
-class LoanApplicationCreate(BaseModel):
-    applicationdate: Optional[str]
-    age: int
-    annualincome: float
-    creditscore: float
-    employmentstatus: str
-    educationlevel: str
-    experience: int
-    loanamount: float
-    loanduration: int
-    maritalstatus: str
-    numberofdependents: int
-    homeownershipstatus: str
-    monthlydebtpayments: float
-    creditcardutilizationrate: float
-    numberofopencreditlines: int
-    numberofcreditinquiries: int
-    debttoincomeratio: float
-    bankruptcyhistory: bool
-    loanpurpose: str
-    previousloandefaults: bool
-    paymenthistory: str
-    lengthofcredithistory: int
-    savingsaccountbalance: float
-    checkingaccountbalance: float
-    totalassets: float
-    totalliabilities: float
-    monthlyincome: float
-    utilitybillspaymenthistory: str
-    jobtenure: int
-    networth: float
-    baseinterestrate: float
-    interestrate: float
-    monthlyloanpayment: float
-    totaldebttoincomeratio: float
-    loanapproved: bool
-    riskscore: float
-
-    class Config:
-        from_attributes = True
+# Rows validated and written per COPY/commit by POST /loans/bulk
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 1000))
+BULK_CONTENT_TYPES = JSON_CONTENT_TYPES | NDJSON_CONTENT_TYPES | CSV_CONTENT_TYPES
+
+# Compute riskscore/interestrate/monthlyloanpayment/totaldebttoincomeratio on every write
+LOAN_SCORING = env_flag("LOAN_SCORING", True)
+
+# Rows fetched per server-side cursor round trip (and per CSV chunk / Arrow batch / Parquet row group)
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 10000))
+
+# Response cache for loan lookups and (opt-in) LangFlow replies
+LOAN_CACHE_TTL = float(os.getenv("LOAN_CACHE_TTL", 300))
+LANGFLOW_CACHE_TTL = float(os.getenv("LANGFLOW_CACHE_TTL", 0))
+response_cache = create_response_cache(
+    backend=os.getenv("CACHE_BACKEND", "memory"),
+    url=os.getenv("CACHE_URL"),
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+    default_ttl=LOAN_CACHE_TTL
+)
+
+# /loans/aggregate and /loans/histogram results, and the optional loan_stats_rollup
+# materialised view (migrations/0002) that unfiltered aggregates are read from
+LOAN_STATS_CACHE_TTL = float(os.getenv("LOAN_STATS_CACHE_TTL", 60))
+LOAN_STATS_VIEW = env_flag("LOAN_STATS_VIEW")
+LOAN_STATS_REFRESH_SECONDS = float(os.getenv("LOAN_STATS_REFRESH_SECONDS", 60))
+# Set by loan writes, cleared when the view is refreshed
+loan_stats_stale = True
+
+# Server-side conversation history and the window of it sent to LangFlow per turn
+SESSION_WINDOW_MESSAGES = int(os.getenv("SESSION_WINDOW_MESSAGES", 12))
+SESSION_WINDOW_CHARS = int(os.getenv("SESSION_WINDOW_CHARS", 12000))
+session_store = create_session_store(
+    backend=os.getenv("SESSION_BACKEND", "memory"),
+    url=os.getenv("SESSION_URL") or os.getenv("CACHE_URL"),
+    max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", 10000)),
+    max_messages=int(os.getenv("SESSION_MAX_MESSAGES", 100)),
+    ttl=float(os.getenv("SESSION_TTL", 86400))
+)
+
+# Answer recognised loan lookups and rate quotes in-process instead of through the agent,
+# whose tools would otherwise call back into this API over the network
+AGENT_FAST_PATH = env_flag("AGENT_FAST_PATH", True)
+
+# Backpressure in front of LangFlow: bounded concurrency with a bounded wait queue,
+# one turn per session at a time, and duplicate in-flight submissions sharing one call.
+# The gate and coalescer are per worker process; the session lock is shared through
+# Redis along with the sessions themselves
+langflow_gate = ConcurrencyGate(
+    max_concurrent=int(os.getenv("LANGFLOW_MAX_CONCURRENCY", 20)),
+    max_waiting=int(os.getenv("LANGFLOW_MAX_QUEUE", 50)),
+    wait_timeout=float(os.getenv("LANGFLOW_QUEUE_TIMEOUT", 10)),
+    retry_after=int(os.getenv("LANGFLOW_RETRY_AFTER", 5))
+)
+# A session's next turn may wait (as long as a LangFlow slot) behind the running one; more are shed
+session_locks = create_session_lock(
+    backend=os.getenv("SESSION_BACKEND", "memory"),
+    url=os.getenv("SESSION_URL") or os.getenv("CACHE_URL"),
+    max_waiting=int(os.getenv("SESSION_MAX_WAITING", 1)),
+    wait_timeout=float(os.getenv("LANGFLOW_QUEUE_TIMEOUT", 10)),
+    retry_after=int(os.getenv("LANGFLOW_RETRY_AFTER", 5)),
+    lock_ttl=float(os.getenv("SESSION_LOCK_TTL", 30))
+)
+langflow_coalescer = RequestCoalescer()
+
+# Agent turns run in the background by POST /agent/jobs, on a bounded worker pool per process;
+# with JOBS_BACKEND=redis every process shares one queue and can report on every job
+agent_jobs = JobQueue(
+    store=create_job_store(
+        backend=os.getenv("JOBS_BACKEND", "memory"),
+        url=os.getenv("JOBS_URL") or os.getenv("CACHE_URL"),
+        max_pending=int(os.getenv("JOBS_MAX_QUEUE", 100)),
+        result_ttl=float(os.getenv("JOBS_RESULT_TTL", 3600))
+    ),
+    max_workers=int(os.getenv("JOBS_MAX_WORKERS", 4)),
+    retry_after=int(os.getenv("LANGFLOW_RETRY_AFTER", 5)),
+    drain_timeout=float(os.getenv("JOBS_DRAIN_TIMEOUT", 30)),
+    webhook_secret=os.getenv("JOBS_WEBHOOK_SECRET"),
+    webhook_timeout=float(os.getenv("JOBS_WEBHOOK_TIMEOUT", 10)),
+    webhook_retries=int(os.getenv("JOBS_WEBHOOK_RETRIES", 3)),
+    webhook_allowed_hosts=[host.strip() for host in os.getenv("JOBS_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()]
+)
+
+# Time every SQL statement for /metrics (the engines themselves are created on first use)
+database.add_engine_hook(instrument_engine)
+
+# With several worker processes, each writes its metrics to this directory and /metrics reports all of them
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+multiprocess_metrics = MultiProcessMetrics(
+    REGISTRY, METRICS_MULTIPROC_DIR, interval=float(os.getenv("METRICS_WRITE_INTERVAL", 5))
+) if METRICS_MULTIPROC_DIR else None
+
+# OpenTelemetry spans for requests, SQL statements and LangFlow calls (off unless an exporter is set)
+TRACING_ENABLED = configure_tracing(
+    exporter=os.getenv("TRACING_EXPORTER", "none"),
+    endpoint=os.getenv("TRACING_ENDPOINT"),
+    file_path=os.getenv("TRACING_FILE")
+)
+database.add_engine_hook(trace_engine)
+
+# Seconds to wait for the database to answer before reporting it unavailable (and retrying)
+DB_READY_TIMEOUT = float(os.getenv("DB_READY_TIMEOUT", 10))
 
 # Global client instance
 langflow_client: Optional[LangFlowClient] = None
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Initialize the LangFlow client on startup."""
+async def refresh_loan_stats_periodically() -> None:
+    """Refresh the loan_stats_rollup view every LOAN_STATS_REFRESH_SECONDS, when loans changed since the last refresh."""
+    global loan_stats_stale
+    
+    while True:
+        await asyncio.sleep(LOAN_STATS_REFRESH_SECONDS)
+        if not loan_stats_stale:
+            continue
+        loan_stats_stale = False
+        try:
+            # CONCURRENTLY keeps the view readable while it is rebuilt
+            async with database.async_engine.begin() as conn:
+                await conn.execute(REFRESH_ROLLUP_SQL)
+            await response_cache.invalidate_namespace("loan_stats")
+        except Exception as e:
+            loan_stats_stale = True
+            logger.error(f"Failed to refresh {ROLLUP_VIEW}: {str(e)}")
+
+
+def init_langflow() -> None:
+    """Create the LangFlow client; without it only the agent endpoints are unavailable."""
     global langflow_client
     
+    # Load configuration from environment
+    langflow_url = os.getenv("LANGFLOW_URL")
+    langflow_api_key = os.getenv("LANGFLOW_API_KEY")
+    langflow_flow_id = os.getenv("LANGFLOW_FLOW_ID")
+    
+    if not all([langflow_url, langflow_api_key, langflow_flow_id]):
+        startup.set_state("langflow", DISABLED, "Missing required LangFlow environment variables")
+        logger.warning("LangFlow is not configured (LANGFLOW_URL, LANGFLOW_API_KEY, LANGFLOW_FLOW_ID); agent endpoints will return 503")
+        return
+    
     try:
-        # Load configuration from environment
-        langflow_url = os.getenv("LANGFLOW_URL")
-        langflow_api_key = os.getenv("LANGFLOW_API_KEY")
-        langflow_flow_id = os.getenv("LANGFLOW_FLOW_ID")
-        
-        if not all([langflow_url, langflow_api_key, langflow_flow_id]):
-            raise ValueError("Missing required LangFlow environment variables")
-        
         langflow_client = create_langflow_client(
             base_url=langflow_url,
             api_key=langflow_api_key,
-            flow_id=langflow_flow_id
+            flow_id=langflow_flow_id,
+            max_connections=int(os.getenv("LANGFLOW_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=int(os.getenv("LANGFLOW_MAX_KEEPALIVE_CONNECTIONS", 20)),
+            keepalive_expiry=float(os.getenv("LANGFLOW_KEEPALIVE_EXPIRY", 30.0)),
+            http2=env_flag("LANGFLOW_HTTP2"),
+            max_retries=int(os.getenv("LANGFLOW_MAX_RETRIES", 2)),
+            retry_backoff=float(os.getenv("LANGFLOW_RETRY_BACKOFF", 0.25)),
+            retry_backoff_max=float(os.getenv("LANGFLOW_RETRY_BACKOFF_MAX", 4.0)),
+            hedge_percentile=float(os.getenv("LANGFLOW_HEDGE_PERCENTILE")) if os.getenv("LANGFLOW_HEDGE_PERCENTILE") else None,
+            flow_read_only=env_flag("LANGFLOW_FLOW_READ_ONLY"),
+            breaker_failure_threshold=int(os.getenv("LANGFLOW_BREAKER_THRESHOLD", 5)),
+            breaker_reset_timeout=float(os.getenv("LANGFLOW_BREAKER_RESET", 30.0)),
+            output_path=os.getenv("LANGFLOW_OUTPUT_PATH", DEFAULT_OUTPUT_PATH),
+            max_logged_payload=int(os.getenv("LANGFLOW_LOG_PAYLOAD_CHARS", 2000))
         )
-        
-        logger.info("LangFlow client initialized successfully")
-        
     except Exception as e:
+        startup.set_state("langflow", UNAVAILABLE, str(e))
         logger.error(f"Failed to initialize LangFlow client: {str(e)}")
-        raise
+        return
+    
+    startup.set_state("langflow", READY)
+    logger.info("LangFlow client initialized successfully")
+
+
+async def ping_database() -> None:
+    async with database.async_engine.connect() as conn:
+        await conn.exec_driver_sql("SELECT 1")
+
+
+async def connect_database() -> None:
+    """
+    Create the database engines off the event loop, then check the database answers,
+    retrying with backoff until it does. Requests arriving first create the engines themselves.
+    """
+    if not database.DATABASE_URL and not database.ASYNC_DATABASE_URL:
+        startup.set_state("database", DISABLED, "DATABASE_URL is not set")
+        return
+    
+    try:
+        # Creating the engines imports the drivers and dialects
+        await asyncio.to_thread(database.create_engines)
+    except Exception as e:
+        startup.set_state("database", UNAVAILABLE, str(e))
+        logger.error(f"Failed to create database engines: {str(e)}")
+        return
+    
+    attempt = 0
+    while True:
+        try:
+            await asyncio.wait_for(ping_database(), DB_READY_TIMEOUT)
+            startup.set_state("database", READY)
+            logger.info(f"Database ready after {startup.elapsed():.3f}s")
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            startup.set_state("database", UNAVAILABLE, error)
+            logger.warning(f"Database not reachable: attempt={attempt + 1}, error={error}")
+        await asyncio.sleep(backoff_delay(attempt, 1.0, 30.0))
+        attempt += 1
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start each subsystem independently and without blocking on the network: LangFlow
+    is configured in-process and the database is connected to in the background.
+    """
+    global langflow_client
+    
+    with startup.phase("langflow"):
+        init_langflow()
+    
+    startup.set_state("database", PENDING)
+    database_task = asyncio.create_task(connect_database())
+    refresh_task = None
+    if LOAN_STATS_VIEW and database.ASYNC_DATABASE_URL:
+        refresh_task = asyncio.create_task(refresh_loan_stats_periodically())
+    with startup.phase("jobs"):
+        agent_jobs.start(run_chat_job)
+    metrics_task = asyncio.create_task(multiprocess_metrics.run()) if multiprocess_metrics is not None else None
+    startup.serving()
     
     yield
     
-    # Cleanup on shutdown
+    # Cleanup on shutdown, letting background jobs finish first (they may still need the database)
+    await agent_jobs.aclose()
+    for task in (database_task, refresh_task, metrics_task):
+        if task is not None:
+            task.cancel()
+    if multiprocess_metrics is not None:
+        # Final counts, kept after this process exits
+        multiprocess_metrics.write()
+    if langflow_client is not None:
+        await langflow_client.aclose()
     langflow_client = None
+    _, async_db_engine = current_engines()
+    if async_db_engine is not None:
+        await async_db_engine.dispose()
+    await response_cache.aclose()
+    await session_store.aclose()
+    await session_locks.aclose()
+    shutdown_tracing()
     logger.info("Application shutdown complete")
 
 
@@ -175,27 +359,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id"],
 )
 
 
 # === Dependencies ===
 def get_db():
     """Database session dependency."""
-    if not SessionLocal:
+    if not database.SessionLocal:
         raise HTTPException(status_code=503, detail="Database not configured")
-    db = SessionLocal()
+    db = database.SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
 
+async def get_async_db():
+    """Async database session dependency."""
+    if not database.AsyncSessionLocal:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_optional_async_db():
+    """Async session dependency for endpoints that only sometimes need the database."""
+    if not database.AsyncSessionLocal:
+        yield None
+        return
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+
 def get_langflow_client() -> LangFlowClient:
     """Dependency to get the LangFlow client instance."""
     if langflow_client is None:
+        reason = (startup.subsystems.get("langflow") or {}).get("error")
         raise HTTPException(
             status_code=503,
-            detail="LangFlow client not initialized"
+            detail=f"LangFlow client not initialized: {reason}" if reason else "LangFlow client not initialized"
         )
     return langflow_client
 
@@ -205,18 +408,58 @@ def generate_correlation_id() -> str:
     return str(uuid.uuid4())
 
 
+def incoming_correlation_id(request: Request) -> str:
+    """
+    Reuse the caller's X-Correlation-ID (e.g. LangFlow tool callbacks made during an
+    /agent turn) so the whole turn shares one ID, otherwise mint a new one.
+    """
+    correlation_id = request.headers.get("X-Correlation-ID", "")
+    if 0 < len(correlation_id) <= 128 and correlation_id.isprintable():
+        return correlation_id
+    return generate_correlation_id()
+
+
 @app.middleware("http")
 async def add_correlation_id(request: Request, call_next):
     """Add correlation ID to all requests for tracing."""
-    correlation_id = generate_correlation_id()
+    correlation_id = incoming_correlation_id(request)
     request.state.correlation_id = correlation_id
     
     start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    
-    response.headers["X-Correlation-ID"] = correlation_id
-    response.headers["X-Process-Time"] = str(process_time)
+    status_code = 500
+    HTTP_IN_FLIGHT.inc()
+    # Root span for the request, continuing the caller's trace if it sent a traceparent
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}",
+        context=extract_trace_context(request.headers),
+        kind=trace.SpanKind.SERVER,
+        attributes={"http.method": request.method, "http.target": request.url.path, "correlation_id": correlation_id}
+    ) as span:
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            process_time = time.time() - start_time
+            HTTP_IN_FLIGHT.dec()
+            # Label by route template, not raw path, to keep series bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            labels = {
+                "method": request.method,
+                "route": route,
+                "status": str(status_code)
+            }
+            HTTP_REQUESTS.inc(**labels)
+            HTTP_LATENCY.observe(process_time, **labels)
+            span.update_name(f"{request.method} {route}")
+            span.set_attribute("http.route", route)
+            span.set_attribute("http.status_code", status_code)
+            if status_code >= 500:
+                span.set_status(trace.Status(trace.StatusCode.ERROR))
+        
+        response.headers["X-Correlation-ID"] = correlation_id
+        response.headers["X-Process-Time"] = str(process_time)
+        if span.get_span_context().is_valid:
+            response.headers["X-Trace-ID"] = trace.format_trace_id(span.get_span_context().trace_id)
     
     return response
 
@@ -241,211 +484,1069 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
+def runtime_metrics():
+    """Scrape-time gauges for connection pools, the LangFlow gate and its circuit breaker."""
+    pool_samples = []
+    for label, db_engine in zip(("sync", "async"), current_engines()):
+        stats = pool_stats(db_engine) or {}
+        for key in ("size", "checked_in", "checked_out", "overflow"):
+            if key in stats:
+                pool_samples.append((f"db_pool_{key}", {"engine": label}, stats[key]))
+    
+    families = [
+        gauge_family(name, "Database connection pool state, by engine.", [row for row in pool_samples if row[0] == name])
+        for name in ("db_pool_size", "db_pool_checked_in", "db_pool_checked_out", "db_pool_overflow")
+    ]
+    families += [
+        gauge_family("langflow_in_flight", "LangFlow calls currently running.", [("langflow_in_flight", {}, langflow_gate.in_flight)]),
+        gauge_family("langflow_waiting", "Requests waiting for a LangFlow slot.", [("langflow_waiting", {}, langflow_gate.waiting)]),
+        counter_family("langflow_rejected_total", "Requests shed by the LangFlow gate.", [("langflow_rejected_total", {}, langflow_gate.rejected)]),
+        counter_family("langflow_coalesced_total", "Requests served by an identical in-flight call.", [("langflow_coalesced_total", {}, langflow_coalescer.coalesced)]),
+    ]
+    
+    jobs = agent_jobs.stats()
+    families += [
+        # Only known for the in-process store; a shared queue is not owned by any one process
+        gauge_family("agent_jobs_queued", "Agent jobs waiting for a worker.", [
+            ("agent_jobs_queued", {}, jobs["queued"])
+        ] if jobs["queued"] is not None else []),
+        gauge_family("agent_jobs_running", "Agent jobs currently running.", [("agent_jobs_running", {}, jobs["running"])]),
+        counter_family("agent_jobs_finished_total", "Agent jobs finished, by outcome.", [
+            ("agent_jobs_finished_total", {"status": "succeeded"}, jobs["succeeded"]),
+            ("agent_jobs_finished_total", {"status": "failed"}, jobs["failed"]),
+        ]),
+        counter_family("agent_jobs_rejected_total", "Agent jobs rejected because the queue was full.", [("agent_jobs_rejected_total", {}, jobs["rejected"])]),
+    ]
+    
+    if langflow_client is not None:
+        resilience = langflow_client.resilience_stats()
+        families += [
+            gauge_family("langflow_circuit_open", "1 while the LangFlow circuit breaker is not closed.", [
+                ("langflow_circuit_open", {}, 0 if resilience["circuit"]["state"] == "closed" else 1)
+            ]),
+            counter_family("langflow_retries_total", "LangFlow requests retried.", [("langflow_retries_total", {}, resilience["retries"])]),
+            counter_family("langflow_hedges_total", "Hedged LangFlow requests sent.", [("langflow_hedges_total", {}, resilience["hedges"])]),
+        ]
+    return families
+
+
+REGISTRY.add_collector(runtime_metrics)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    registry = multiprocess_metrics if multiprocess_metrics is not None else REGISTRY
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Health check endpoint; each subsystem reports its own readiness under ``ready``."""
+    sync_engine, async_db_engine = current_engines()
     return {
-        "status": "healthy",
+        "status": startup.status(),
         "timestamp": time.time(),
+        # Each worker process has its own pools, caches and counters
+        "worker_pid": os.getpid(),
+        "ready": startup.subsystems,
+        "startup": startup.to_dict(),
         "langflow_client_ready": langflow_client is not None,
-        "database_ready": SessionLocal is not None
+        "langflow_resilience": langflow_client.resilience_stats() if langflow_client is not None else None,
+        "database_ready": startup.state("database") == READY,
+        "database_pool": pool_stats(sync_engine),
+        "async_database_pool": pool_stats(async_db_engine),
+        "cache": response_cache.stats(),
+        "sessions": session_store.size(),
+        "langflow_gate": {
+            **langflow_gate.stats(),
+            "locked_sessions": len(session_locks),
+            "session_waiting": session_locks.waiting,
+            "session_rejected": session_locks.rejected,
+            "coalesced": langflow_coalescer.coalesced
+        },
+        "agent_jobs": agent_jobs.stats()
     }
 
 
+def parse_loan_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated ``fields=`` projection into LoanApplication column names."""
+    if not fields:
+        return None
+    
+    names = list(dict.fromkeys(name.strip().lower() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in LOAN_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown loan fields: {', '.join(unknown)}")
+    
+    # Always return the primary key so clients can page and follow up on rows
+    if "id" not in names:
+        names.insert(0, "id")
+    return names
+
+
+def loan_select_columns(names: Optional[List[str]] = None) -> List[Any]:
+    """
+    Columns to select for list responses, all of them by default.
+    
+    Numeric columns are cast to float in SQL so the driver hands back floats
+    instead of Decimals that would need converting one by one.
+    """
+    columns = [LOAN_COLUMNS[name] for name in names] if names else list(LOAN_COLUMNS.values())
+    return [
+        cast(column, Float).label(column.name) if isinstance(column.type, Numeric) and not isinstance(column.type, Float) else column
+        for column in columns
+    ]
+
+
+def row_dicts(result) -> List[Dict[str, Any]]:
+    """Plain dicts from a result's tuples, ready for ORJSONResponse without model validation."""
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result.all()]
+
+
+async def invalidate_loan_cache(loan_id: Optional[int] = None) -> None:
+    """Drop cached data that a loan mutation may have made stale."""
+    global loan_stats_stale
+    
+    if loan_id is not None:
+        await response_cache.invalidate("loan", loan_id)
+    await response_cache.invalidate_namespace("loan_stats")
+    loan_stats_stale = True
+    # Agent replies may quote any loan, so any write invalidates them all
+    await response_cache.invalidate_namespace("langflow")
+
+
 # === Database CRUD Endpoints ===
-@app.get("/loans", response_model=List[LoanApplicationCreate])
-def read_loans(db: Session = Depends(get_db)):
-    """Get all loan applications."""
-    return db.query(LoanApplication).all()
+@app.get("/loans", response_model=List[LoanApplicationRead])
+async def read_loans(
+    after_id: Optional[int] = Query(None, ge=0, description="Return loans with an id greater than this cursor"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of loans to return"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of columns to return"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get loan applications, one page at a time.
+    
+    Pages are ordered by id; pass the ``X-Next-After-Id`` response header (or the
+    last id of the page) as ``after_id`` to fetch the next page.
+    """
+    stmt = select(*loan_select_columns(parse_loan_fields(fields)))
+    
+    if after_id is not None:
+        stmt = stmt.where(LoanApplication.id > after_id)
+    result = await db.execute(stmt.order_by(LoanApplication.id).limit(limit))
+    rows = row_dicts(result)
+    
+    headers = {"X-Next-After-Id": str(rows[-1]["id"])} if len(rows) == limit else {}
+    return ORJSONResponse(content=rows, headers=headers)
 
 
 @app.post("/loans", response_model=LoanApplicationCreate)
-def create_loan(application: LoanApplicationCreate, db: Session = Depends(get_db)):
+async def create_loan(application: LoanApplicationCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new loan application."""
-    db_app = LoanApplication(**application.dict())
+    data = application.dict()
+    if LOAN_SCORING:
+        score_records([data])
+    db_app = LoanApplication(**data)
     db.add(db_app)
-    db.commit()
-    db.refresh(db_app)
+    await db.commit()
+    await db.refresh(db_app)
+    await invalidate_loan_cache()
     return db_app
 
 
+@app.post(
+    "/loans/bulk",
+    response_model=BulkLoanResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/LoanApplicationCreate"}}},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def bulk_create_loans(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Create many loan applications in one request.
+    
+    Accepts a JSON array, NDJSON or CSV body (by Content-Type). Rows are validated
+    and written in batches of BULK_BATCH_SIZE using COPY; invalid rows are skipped
+    and reported with their 0-based position, valid rows return their new ids.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    body = await request.body()
+    
+    try:
+        records = iter_body_records(body, content_type)
+    except ValueError as e:
+        status_code = 400 if content_type in BULK_CONTENT_TYPES else 415
+        raise HTTPException(status_code=status_code, detail=str(e))
+    
+    result = await ingest_records(db, records, batch_size=BULK_BATCH_SIZE, score=LOAN_SCORING)
+    if result.inserted:
+        await invalidate_loan_cache()
+    logger.info(f"Bulk loan ingest: inserted={result.inserted}, rejected={len(result.errors)}")
+    return result
+
+
 @app.put("/loans/{loan_id}", response_model=LoanApplicationCreate)
-def update_loan(loan_id: int, updated_data: LoanApplicationCreate, db: Session = Depends(get_db)):
+async def update_loan(loan_id: int, updated_data: LoanApplicationCreate, db: AsyncSession = Depends(get_async_db)):
     """Update an existing loan application."""
-    loan = db.query(LoanApplication).filter(LoanApplication.id == loan_id).first()
+    loan = await db.get(LoanApplication, loan_id)
     if not loan:
         raise HTTPException(status_code=404, detail="Loan application not found")
     
-    for key, value in updated_data.dict().items():
+    data = updated_data.dict()
+    if LOAN_SCORING:
+        score_records([data])
+    else:
+        # Client-supplied values are not this model's output
+        data["scoringversion"] = None
+    for key, value in data.items():
         setattr(loan, key, value)
     
-    db.commit()
-    db.refresh(loan)
+    await db.commit()
+    await db.refresh(loan)
+    await invalidate_loan_cache(loan_id)
     return loan
 
 
 @app.delete("/loans/{loan_id}")
-def delete_loan(loan_id: int, db: Session = Depends(get_db)):
+async def delete_loan(loan_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a loan application."""
-    loan = db.query(LoanApplication).filter(LoanApplication.id == loan_id).first()
+    loan = await db.get(LoanApplication, loan_id)
     if not loan:
         raise HTTPException(status_code=404, detail="Loan application not found")
     
-    db.delete(loan)
-    db.commit()
+    await db.delete(loan)
+    await db.commit()
+    await invalidate_loan_cache(loan_id)
     return {"message": f"Loan application {loan_id} deleted successfully"}
 
 
-@app.get("/loans/search", response_model=List[LoanApplicationCreate])
-def search_loans(
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def loan_search_filters(
     age: Optional[int] = None,
     loanamount: Optional[float] = Query(None, description="Exact loan amount"),
     creditscore: Optional[float] = Query(None, description="Exact credit score"),
     employmentstatus: Optional[str] = Query(None, description="Partial match"),
     loanapproved: Optional[bool] = Query(None, description="Whether the loan was approved"),
-    db: Session = Depends(get_db),
-):
-    """Search loan applications with filters."""
-    query = db.query(LoanApplication)
-
-    if age is not None:
-        query = query.filter(LoanApplication.age == age)
-    if loanamount is not None:
-        query = query.filter(LoanApplication.loanamount == loanamount)
-    if creditscore is not None:
-        query = query.filter(LoanApplication.creditscore == creditscore)
+    min_age: Optional[int] = Query(None, description="Minimum age"),
+    max_age: Optional[int] = Query(None, description="Maximum age"),
+    min_annualincome: Optional[float] = Query(None, description="Minimum annual income"),
+    max_annualincome: Optional[float] = Query(None, description="Maximum annual income"),
+    min_creditscore: Optional[float] = Query(None, description="Minimum credit score"),
+    max_creditscore: Optional[float] = Query(None, description="Maximum credit score"),
+    min_loanamount: Optional[float] = Query(None, description="Minimum loan amount"),
+    max_loanamount: Optional[float] = Query(None, description="Maximum loan amount"),
+    min_debttoincomeratio: Optional[float] = Query(None, description="Minimum debt-to-income ratio"),
+    max_debttoincomeratio: Optional[float] = Query(None, description="Maximum debt-to-income ratio"),
+    min_riskscore: Optional[float] = Query(None, description="Minimum risk score"),
+    max_riskscore: Optional[float] = Query(None, description="Maximum risk score"),
+    applicationdate_from: Optional[date] = Query(None, description="Earliest application date (inclusive)"),
+    applicationdate_to: Optional[date] = Query(None, description="Latest application date (inclusive)"),
+) -> List[Any]:
+    """Dependency turning the loan search query parameters into SQLAlchemy filter clauses."""
+    filters = []
+    
+    equals = {
+        LoanApplication.age: age,
+        LoanApplication.loanamount: loanamount,
+        LoanApplication.creditscore: creditscore,
+        LoanApplication.loanapproved: loanapproved,
+    }
+    ranges = {
+        LoanApplication.age: (min_age, max_age),
+        LoanApplication.annualincome: (min_annualincome, max_annualincome),
+        LoanApplication.creditscore: (min_creditscore, max_creditscore),
+        LoanApplication.loanamount: (min_loanamount, max_loanamount),
+        LoanApplication.debttoincomeratio: (min_debttoincomeratio, max_debttoincomeratio),
+        LoanApplication.riskscore: (min_riskscore, max_riskscore),
+        LoanApplication.applicationdate: (applicationdate_from, applicationdate_to),
+    }
+    
+    for column, value in equals.items():
+        if value is not None:
+            filters.append(column == value)
+    for column, (low, high) in ranges.items():
+        if low is not None:
+            filters.append(column >= low)
+        if high is not None:
+            filters.append(column <= high)
     if employmentstatus is not None:
-        query = query.filter(LoanApplication.employmentstatus.ilike(f"%{employmentstatus}%"))
-    if loanapproved is not None:
-        query = query.filter(LoanApplication.loanapproved == loanapproved)
+        # Served by the pg_trgm GIN index, which (unlike btree) supports leading wildcards
+        filters.append(LoanApplication.employmentstatus.ilike(f"%{escape_like(employmentstatus)}%", escape="\\"))
+    
+    return filters
 
-    return query.all()
 
+# Columns /loans/search may sort by (all backed by an index)
+SEARCH_SORT_COLUMNS = {
+    "id", "applicationdate", "age", "annualincome", "creditscore",
+    "loanamount", "debttoincomeratio", "riskscore", "interestrate",
+}
 
-@app.post("/calculate-rate")
-def calculate_rate(income: float, loan_amount: float, duration: int):
-    """Calculate interest rate based on loan parameters."""
-    base_rate = 3.5
-    risk_factor = (loan_amount / income) * 0.1
-    duration_factor = (duration / 12) * 0.05
-    interest = base_rate + risk_factor + duration_factor
-    return {"calculated_rate": round(interest, 2)}
 
+def parse_loan_sort(sort: str):
+    """Parse ``column`` / ``-column`` into ORDER BY clauses, with id as a stable tie-breaker."""
+    descending = sort.startswith("-")
+    name = sort.lstrip("-+").strip().lower()
+    if name not in SEARCH_SORT_COLUMNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot sort by '{name}'. Allowed: {', '.join(sorted(SEARCH_SORT_COLUMNS))}"
+        )
+    
+    column = LOAN_COLUMNS[name]
+    order = [column.desc() if descending else column.asc()]
+    if name != "id":
+        order.append(LoanApplication.id.asc())
+    return order
 
-@app.post("/agent", response_model=ChatResponse)
-async def chat_agent(
-    request: ChatRequest,
-    http_request: Request,
-    client: LangFlowClient = Depends(get_langflow_client)
-) -> ChatResponse:
+
+@app.get("/loans/search", response_model=List[LoanApplicationRead])
+async def search_loans(
+    filters: List[Any] = Depends(loan_search_filters),
+    sort: str = Query("id", description="Sort column, prefix with '-' for descending"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of loans to return"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Search loan applications with exact, range and partial-text filters."""
+    stmt = select(*loan_select_columns()).where(*filters).order_by(*parse_loan_sort(sort)).limit(limit)
+    result = await db.execute(stmt)
+    return ORJSONResponse(content=row_dicts(result))
+
+
+@app.get("/loans/export")
+async def export_loans(
+    export_format: str = Query("csv", alias="format", description="csv, arrow (IPC stream) or parquet"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of columns to export"),
+    filters: List[Any] = Depends(loan_search_filters),
+):
     """
-    Main chat endpoint that forwards requests to LangFlow.
+    Stream loan applications for bulk consumers, optionally filtered like /loans/search.
     
-    Accepts a session_id and array of messages, returns the assistant's response
-    with metadata including correlation tracking.
+    Rows are read through a server-side cursor in EXPORT_CHUNK_ROWS chunks and
+    encoded chunk by chunk, so memory use does not grow with the table.
     """
-    correlation_id = getattr(http_request.state, 'correlation_id', generate_correlation_id())
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format '{export_format}'. Allowed: {', '.join(EXPORT_FORMATS)}")
+    if not database.AsyncSessionLocal:
+        raise HTTPException(status_code=503, detail="Database not configured")
     
-    logger.info(
-        f"Chat request received: correlation_id={correlation_id}, "
-        f"session_id={request.session_id}, message_count={len(request.messages)}"
+    columns = loan_select_columns(parse_loan_fields(fields))
+    stmt = (
+        select(*columns)
+        .where(*filters)
+        .order_by(LoanApplication.id)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
     )
     
+    async def partitions():
+        # The session lives as long as the response body, not the request handler
+        async with database.AsyncSessionLocal() as db:
+            result = await db.stream(stmt)
+            async for rows in result.partitions():
+                yield rows
+    
+    if export_format == "csv":
+        body = csv_chunks([column.name for column in columns], partitions())
+    else:
+        try:
+            schema = arrow_schema(columns)
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        encode = arrow_chunks if export_format == "arrow" else parquet_chunks
+        body = encode(schema, partitions())
+    
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="loans.{extension}"'}
+    )
+
+
+@app.get("/loans/aggregate")
+async def aggregate_loans(
+    request: Request,
+    group_by: Optional[str] = Query(None, description="Comma-separated columns to group by"),
+    metrics: str = Query("count", description="Comma-separated metrics: count, avg|sum|min|max:<column>, p<NN>:<column>, rate:<column>"),
+    filters: List[Any] = Depends(loan_search_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Group-by statistics computed in SQL, optionally filtered like /loans/search.
+    
+    e.g. ``group_by=employmentstatus&metrics=count,rate:loanapproved,avg:riskscore,p90:debttoincomeratio``.
+    Metrics come back as ``count`` and ``<function>_<column>`` keys on every group.
+    """
     try:
-        # Validate that there's at least one user message
-        user_messages = [msg for msg in request.messages if msg.role == "user"]
-        if not user_messages:
-            raise HTTPException(
-                status_code=400,
-                detail=ChatError(
-                    error=ErrorDetail(
-                        detail="At least one user message is required",
-                        code="NO_USER_MESSAGE",
-                        correlation_id=correlation_id
-                    )
-                ).dict()
-            )
+        groups = parse_group_by(group_by)
+        requested = parse_metrics(metrics)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if any(metric.quantile is not None for metric in requested) and database.async_engine.dialect.name != "postgresql":
+        raise HTTPException(status_code=400, detail="Percentile metrics require PostgreSQL")
+    
+    cache_key = ["aggregate", sorted(request.query_params.multi_items())]
+    content = await response_cache.get("loan_stats", cache_key)
+    if content is None:
+        version = await response_cache.version("loan_stats", cache_key)
+        stmt, from_rollup = aggregate_statement(groups, requested, filters, use_rollup=LOAN_STATS_VIEW)
+        result = await db.execute(stmt)
+        content = {
+            "group_by": groups,
+            "source": ROLLUP_VIEW if from_rollup else LoanApplication.__tablename__,
+            "groups": row_dicts(result),
+        }
+        await response_cache.set("loan_stats", cache_key, content, ttl=LOAN_STATS_CACHE_TTL, version=version)
+    return ORJSONResponse(content=content)
+
+
+@app.get("/loans/histogram")
+async def loan_histogram(
+    request: Request,
+    column: str = Query(..., description="Numeric column to bucket"),
+    bins: int = Query(20, ge=1, le=200, description="Number of equal-width buckets"),
+    min_value: Optional[float] = Query(None, alias="min", description="Lower edge (default: smallest value)"),
+    max_value: Optional[float] = Query(None, alias="max", description="Upper edge (default: largest value)"),
+    group_by: Optional[str] = Query(None, description="Comma-separated columns to split the histogram by"),
+    filters: List[Any] = Depends(loan_search_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Distribution of a numeric column as ``bins + 1`` edges and a counts list per group, computed in SQL."""
+    name = column.strip().lower()
+    if name not in MEASURE_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Cannot bucket '{name}'. Allowed: {', '.join(sorted(MEASURE_COLUMNS))}")
+    try:
+        groups = parse_group_by(group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    cache_key = ["histogram", sorted(request.query_params.multi_items())]
+    content = await response_cache.get("loan_stats", cache_key)
+    if content is not None:
+        return ORJSONResponse(content=content)
+    version = await response_cache.version("loan_stats", cache_key)
+    
+    low, high = min_value, max_value
+    if low is None or high is None:
+        target = LOAN_COLUMNS[name]
+        bounds = (await db.execute(select(func.min(target), func.max(target)).where(*filters))).one()
+        low = bounds[0] if low is None else low
+        high = bounds[1] if high is None else high
+    
+    content = {"column": name, "group_by": groups, "edges": [], "groups": []}
+    if low is not None and high is not None:
+        low, high = float(low), float(high)
+        if high < low:
+            raise HTTPException(status_code=400, detail="max must not be smaller than min")
+        if high == low:
+            # A single distinct value still gets a bucket of non-zero width
+            high = low + 1
+        result = await db.execute(histogram_statement(name, bins, low, high, groups, filters))
+        content["edges"] = [low + (high - low) * i / bins for i in range(bins + 1)]
+        content["groups"] = histogram_groups(result.all(), groups, bins)
+    
+    await response_cache.set("loan_stats", cache_key, content, ttl=LOAN_STATS_CACHE_TTL, version=version)
+    return ORJSONResponse(content=content)
+
+
+async def load_loan(db: AsyncSession, loan_id: int) -> Optional[Dict[str, Any]]:
+    """A loan application as a JSON-ready dict, through the response cache; None if it does not exist."""
+    loan = await response_cache.get("loan", loan_id)
+    if loan is None:
+        # Taken before the read, so a row fetched just before a concurrent update is not cached after it
+        version = await response_cache.version("loan", loan_id)
+        row = await db.get(LoanApplication, loan_id)
+        if not row:
+            return None
+        loan = jsonable_encoder(LoanApplicationRead.model_validate(row))
+        await response_cache.set("loan", loan_id, loan, version=version)
+    return loan
+
+
+# Declared after /loans/search so the literal path is matched first
+@app.get("/loans/{loan_id}", response_model=LoanApplicationRead)
+async def read_loan(
+    loan_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated list of columns to return"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get a single loan application by id (served from the response cache when possible)."""
+    columns = parse_loan_fields(fields)
+    
+    loan = await load_loan(db, loan_id)
+    if loan is None:
+        raise HTTPException(status_code=404, detail="Loan application not found")
+    
+    if columns:
+        return ORJSONResponse(content={name: loan[name] for name in columns})
+    return ORJSONResponse(content=loan)
+
+
+@app.post("/calculate-rate")
+def calculate_rate(income: float = Query(..., gt=0), loan_amount: float = Query(...), duration: int = Query(...)):
+    """Calculate interest rate based on loan parameters."""
+    return {"calculated_rate": round(pricing.calculate_rate(income, loan_amount, duration), 2)}
+
+
+def quote_loan(income: float, loan_amount: float, duration: int) -> Dict[str, float]:
+    """Rate and amortised monthly payment for one loan, as /calculate-rate/batch computes them."""
+    rate = pricing.calculate_rate(income, loan_amount, duration)
+    payment = pricing.monthly_payments(np.float64(loan_amount), np.float64(rate), np.float64(duration))
+    return {"calculated_rate": round(rate, 2), "monthly_payment": round(float(payment), 2)}
+
+
+def quote_stored_loan(loan: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Rate (percent) and monthly payment of a stored application: the ones stored with it
+    (set by the risk model, or imported), so every answer about a loan quotes the same
+    figures, else quote_loan from its income, amount and duration. None when neither is possible.
+    """
+    if loan.get("interestrate") is not None and loan.get("monthlyloanpayment") is not None:
+        return {
+            "calculated_rate": round(float(loan["interestrate"]) * 100, 2),
+            "monthly_payment": round(float(loan["monthlyloanpayment"]), 2),
+            "source": "stored",
+        }
+    if not loan.get("annualincome") or not loan.get("loanamount") or not loan.get("loanduration"):
+        return None
+    return {**quote_loan(loan["annualincome"], loan["loanamount"], loan["loanduration"]), "source": "pricing_model"}
+
+
+# Upper bound on bind parameters per IN (...) query when pricing by loan id
+PRICING_ID_CHUNK = 10000
+
+
+@app.post("/calculate-rate/batch", response_model=RateBatchResponse)
+async def calculate_rate_batch(
+    request: RateBatchRequest,
+    db: Optional[AsyncSession] = Depends(get_optional_async_db),
+):
+    """
+    Price many loans in one request.
+    
+    Send parallel ``income``/``loan_amount``/``duration`` arrays (and optionally
+    ``monthly_debt``), or ``loan_ids`` to price stored applications. Returns rates,
+    amortised monthly payments and total debt-to-income ratios in input order;
+    values that cannot be computed (e.g. zero income) are null.
+    """
+    missing_ids = None
+    if request.loan_ids is not None:
+        if db is None:
+            raise HTTPException(status_code=503, detail="Database not configured")
         
-        # Send to LangFlow
-        response = await client.send_message(
-            messages=request.messages,
-            session_id=request.session_id,
-            correlation_id=correlation_id
-        )
+        columns = [
+            LoanApplication.id,
+            LoanApplication.annualincome,
+            LoanApplication.loanamount,
+            LoanApplication.loanduration,
+            LoanApplication.monthlydebtpayments,
+        ]
+        found = {}
+        unique_ids = list(dict.fromkeys(request.loan_ids))
+        for start in range(0, len(unique_ids), PRICING_ID_CHUNK):
+            chunk = unique_ids[start:start + PRICING_ID_CHUNK]
+            result = await db.execute(select(*columns).where(LoanApplication.id.in_(chunk)))
+            found.update((row.id, row) for row in result)
         
-        logger.info(
-            f"Chat response successful: correlation_id={correlation_id}, "
-            f"session_id={request.session_id}, response_length={len(response.output_text)}"
-        )
+        loan_ids = [loan_id for loan_id in request.loan_ids if loan_id in found]
+        missing_ids = [loan_id for loan_id in unique_ids if loan_id not in found]
+        rows = [found[loan_id] for loan_id in loan_ids]
         
-        return response
+        income = np.array([row.annualincome for row in rows], dtype=float)
+        loan_amount = np.array([row.loanamount for row in rows], dtype=float)
+        duration = np.array([row.loanduration for row in rows], dtype=float)
+        monthly_debt = np.array([row.monthlydebtpayments or 0 for row in rows], dtype=float)
+    else:
+        loan_ids = None
+        income = np.asarray(request.income, dtype=float)
+        loan_amount = np.asarray(request.loan_amount, dtype=float)
+        duration = np.asarray(request.duration, dtype=float)
+        monthly_debt = np.asarray(request.monthly_debt, dtype=float) if request.monthly_debt is not None else np.zeros_like(income)
     
-    except TimeoutError as e:
-        logger.error(f"LangFlow timeout: correlation_id={correlation_id}, error={str(e)}")
-        raise HTTPException(
-            status_code=504,
-            detail=ChatError(
-                error=ErrorDetail(
-                    detail="The AI service is taking too long to respond. Please try again.",
-                    code="TIMEOUT",
-                    correlation_id=correlation_id
-                )
-            ).dict()
-        )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = pricing.calculate_rates(income, loan_amount, duration)
+        payments = pricing.monthly_payments(loan_amount, rates, duration)
+        dti = pricing.debt_to_income(monthly_debt, payments, income / 12)
     
-    except ValueError as e:
-        logger.error(f"Validation error: correlation_id={correlation_id}, error={str(e)}")
+    return RateBatchResponse(
+        loan_ids=loan_ids,
+        missing_ids=missing_ids,
+        calculated_rate=pricing.to_json_floats(rates, 2),
+        monthly_payment=pricing.to_json_floats(payments, 2),
+        debt_to_income_ratio=pricing.to_json_floats(dti, 4),
+    )
+
+
+def langflow_error(exc: Exception, correlation_id: str) -> Tuple[int, ChatError]:
+    """Map an exception raised by LangFlowClient to an HTTP status and ChatError body."""
+    if isinstance(exc, OverloadedError):
+        status_code, code, detail = 429, "OVERLOADED", "The AI service is busy. Please retry shortly."
+    elif isinstance(exc, CircuitOpenError):
+        status_code, code, detail = 503, "SERVICE_UNAVAILABLE", "AI service is temporarily unavailable. Please try again later."
+    elif isinstance(exc, TimeoutError):
+        status_code, code, detail = 504, "TIMEOUT", "The AI service is taking too long to respond. Please try again."
+    elif isinstance(exc, ValueError):
+        status_code, code, detail = 400, "VALIDATION_ERROR", str(exc)
+    elif isinstance(exc, ConnectionError):
+        status_code, code, detail = 502, "CONNECTION_ERROR", "Unable to connect to AI service. Please try again later."
+    elif isinstance(exc, RuntimeError):
+        status_code, code, detail = 502, "SERVICE_ERROR", "AI service is currently unavailable. Please try again later."
+    else:
+        status_code, code, detail = 500, "UNKNOWN_ERROR", "An unexpected error occurred. Please try again."
+    
+    return status_code, ChatError(
+        error=ErrorDetail(
+            detail=detail,
+            code=code,
+            correlation_id=correlation_id
+        )
+    )
+
+
+@contextmanager
+def track_langflow_call(endpoint: str):
+    """Record the latency and, on failure, the error code of one LangFlow call."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        _, error = langflow_error(e, "")
+        LANGFLOW_ERRORS.inc(endpoint=endpoint, code=error.error.code)
+        LANGFLOW_LATENCY.observe(time.perf_counter() - start_time, endpoint=endpoint, outcome=error.error.code)
+        raise
+    LANGFLOW_LATENCY.observe(time.perf_counter() - start_time, endpoint=endpoint, outcome="success")
+
+
+def require_user_message(request: ChatRequest, correlation_id: str) -> None:
+    """Reject chat requests that do not contain at least one user message."""
+    if request.messages is not None and not any(msg.role == "user" for msg in request.messages):
         raise HTTPException(
             status_code=400,
             detail=ChatError(
                 error=ErrorDetail(
-                    detail=str(e),
-                    code="VALIDATION_ERROR",
+                    detail="At least one user message is required",
+                    code="NO_USER_MESSAGE",
                     correlation_id=correlation_id
                 )
             ).dict()
         )
+
+
+async def resolve_conversation(request: ChatRequest) -> Tuple[List[ChatMessage], List[ChatMessage]]:
+    """
+    Work out what to send LangFlow for this turn.
     
-    except ConnectionError as e:
-        logger.error(f"Connection error: correlation_id={correlation_id}, error={str(e)}")
-        raise HTTPException(
-            status_code=502,
-            detail=ChatError(
-                error=ErrorDetail(
-                    detail="Unable to connect to AI service. Please try again later.",
-                    code="CONNECTION_ERROR",
-                    correlation_id=correlation_id
+    Returns the bounded context window and the new messages to record in the
+    session store once the turn succeeds (none for legacy full-history requests).
+    """
+    if request.message is None:
+        return build_context_window(request.messages, SESSION_WINDOW_MESSAGES, SESSION_WINDOW_CHARS), []
+    
+    new_message = ChatMessage(role="user", content=request.message)
+    history = await session_store.get_history(request.session_id)
+    window = build_context_window(history + [new_message], SESSION_WINDOW_MESSAGES, SESSION_WINDOW_CHARS)
+    return window, [new_message]
+
+
+async def record_turn(session_id: str, new_messages: List[ChatMessage], output_text: str) -> None:
+    """Append a completed turn to the server-side history."""
+    if not new_messages:
+        return
+    if output_text:
+        # Replies are not bound by the request size limits, so skip re-validation
+        new_messages = new_messages + [ChatMessage.model_construct(role="assistant", content=output_text)]
+    await session_store.append(session_id, new_messages)
+
+
+def langflow_cache_key(session_id: str, messages: List[ChatMessage], flow_id: str) -> List[Any]:
+    """Cache key for a chat turn: the session plus its case- and whitespace-normalised messages."""
+    return [
+        flow_id,
+        session_id,
+        [(msg.role, " ".join(msg.content.split()).lower()) for msg in messages],
+    ]
+
+
+def chat_request_key(request: ChatRequest, flow_id: Optional[str]) -> str:
+    """Identity of a chat submission, used to coalesce duplicates that are still in flight."""
+    if request.message is None:
+        messages = request.messages
+    else:
+        messages = [ChatMessage(role="user", content=request.message)]
+    return json.dumps([request.message is not None, langflow_cache_key(request.session_id, messages, flow_id)])
+
+
+def retry_after_headers(exc: Exception) -> Optional[Dict[str, str]]:
+    """Retry-After header for requests shed by the LangFlow gate or its circuit breaker."""
+    if isinstance(exc, (OverloadedError, CircuitOpenError)):
+        return {"Retry-After": str(exc.retry_after)}
+    return None
+
+
+def fast_path_intent(request: ChatRequest) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """The structured intent of the turn's user message, if the backend can answer it itself."""
+    if not AGENT_FAST_PATH:
+        return None
+    if request.message is not None:
+        intent = match_intent(request.message)
+    else:
+        last = request.messages[-1]
+        intent = match_intent(last.content) if last.role == "user" else None
+    # Loan intents need the database; without it the agent still gets the question
+    if intent is not None and intent[0] != "rate_quote" and not database.AsyncSessionLocal:
+        return None
+    return intent
+
+
+async def answer_intent(name: str, params: Dict[str, Any]) -> str:
+    """Reply to a fast-path intent straight from the database and pricing model."""
+    if name == "rate_quote":
+        quote = quote_loan(params["income"], params["loan_amount"], params["duration"])
+        text = describe_quote(
+            params["income"], params["loan_amount"], params["duration"], quote["calculated_rate"], quote["monthly_payment"]
+        )
+    else:
+        async with database.AsyncSessionLocal() as db:
+            loan = await load_loan(db, params["loan_id"])
+        if loan is None:
+            text = f"I couldn't find a loan application with id {params['loan_id']}."
+        elif name == "loan_lookup":
+            text = describe_loan(loan)
+        else:
+            quote = quote_stored_loan(loan)
+            if quote is None:
+                text = f"Loan {loan['id']} is missing the income, amount or duration needed for a rate quote."
+            elif quote["source"] == "stored":
+                text = describe_loan_rate(loan["id"], quote["calculated_rate"], quote["monthly_payment"])
+            else:
+                text = describe_quote(
+                    loan["annualincome"], loan["loanamount"], loan["loanduration"], quote["calculated_rate"], quote["monthly_payment"]
                 )
-            ).dict()
+    AGENT_FAST_PATH_TURNS.inc(intent=name)
+    return text
+
+
+def langflow_client_for(request: ChatRequest) -> Optional[LangFlowClient]:
+    """The LangFlow client a turn needs (503 when it is unavailable), or None for a fast-path intent."""
+    if fast_path_intent(request) is not None:
+        return langflow_client
+    return get_langflow_client()
+
+
+async def run_chat_turn(request: ChatRequest, client: Optional[LangFlowClient], correlation_id: str) -> ChatResponse:
+    """
+    Run one /agent turn, serialised per session and admitted through the LangFlow gate.
+    ``client`` may be None only for turns that ``fast_path_intent`` answers in-process.
+    """
+    async with session_locks.hold(request.session_id):
+        messages, new_messages = await resolve_conversation(request)
+        
+        logger.info(
+            f"Chat request received: correlation_id={correlation_id}, "
+            f"session_id={request.session_id}, message_count={len(messages)}"
         )
-    
-    except RuntimeError as e:
-        logger.error(f"Runtime error: correlation_id={correlation_id}, error={str(e)}")
-        raise HTTPException(
-            status_code=502,
-            detail=ChatError(
-                error=ErrorDetail(
-                    detail="AI service is currently unavailable. Please try again later.",
-                    code="SERVICE_ERROR",
+        
+        intent = fast_path_intent(request)
+        if intent is not None:
+            start_time = time.time()
+            output_text = await answer_intent(*intent)
+            logger.info(f"Chat request answered without LangFlow: correlation_id={correlation_id}, intent={intent[0]}")
+            await record_turn(request.session_id, new_messages, output_text)
+            return ChatResponse(
+                output_text=output_text,
+                meta={
+                    "session_id": request.session_id,
+                    "correlation_id": correlation_id,
+                    "response_time_ms": int((time.time() - start_time) * 1000),
+                    "fast_path": intent[0]
+                }
+            )
+        
+        cache_key = langflow_cache_key(request.session_id, messages, client.flow_id)
+        if LANGFLOW_CACHE_TTL > 0:
+            cached = await response_cache.get("langflow", cache_key)
+            if cached is not None:
+                logger.info(f"Chat response served from cache: correlation_id={correlation_id}, session_id={request.session_id}")
+                await record_turn(request.session_id, new_messages, cached["output_text"])
+                return ChatResponse(
+                    output_text=cached["output_text"],
+                    meta={**(cached.get("meta") or {}), "correlation_id": correlation_id, "cached": True}
+                )
+        
+        # Send to LangFlow
+        async with langflow_gate.slot():
+            with track_langflow_call("agent"):
+                response = await client.send_message(
+                    messages=messages,
+                    session_id=request.session_id,
                     correlation_id=correlation_id
                 )
-            ).dict()
+        
+        logger.info(
+            f"Chat response successful: correlation_id={correlation_id}, "
+            f"session_id={request.session_id}, response_length={len(response.output_text)}"
         )
+        
+        # Replies flagged with an error (e.g. unparseable output) are neither remembered nor repeated
+        if not (response.meta or {}).get("error"):
+            await record_turn(request.session_id, new_messages, response.output_text)
+            if LANGFLOW_CACHE_TTL > 0:
+                await response_cache.set("langflow", cache_key, response.dict(), ttl=LANGFLOW_CACHE_TTL)
+        
+        return response
+
+
+@app.post("/agent", response_model=ChatResponse)
+async def chat_agent(
+    request: ChatRequest,
+    http_request: Request
+) -> ChatResponse:
+    """
+    Main chat endpoint that forwards requests to LangFlow.
     
+    Accepts a session_id and either the new ``message`` (history kept server-side)
+    or the full array of ``messages``, returns the assistant's response with
+    metadata including correlation tracking.
+    """
+    correlation_id = getattr(http_request.state, 'correlation_id', generate_correlation_id())
+    
+    require_user_message(request, correlation_id)
+    client = langflow_client_for(request)
+    
+    try:
+        response, coalesced = await langflow_coalescer.run(
+            chat_request_key(request, client.flow_id if client is not None else None),
+            lambda: run_chat_turn(request, client, correlation_id)
+        )
     except Exception as e:
-        logger.error(f"Unexpected error: correlation_id={correlation_id}, error={str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=ChatError(
-                error=ErrorDetail(
-                    detail="An unexpected error occurred. Please try again.",
-                    code="UNKNOWN_ERROR",
-                    correlation_id=correlation_id
-                )
-            ).dict()
+        status_code, error = langflow_error(e, correlation_id)
+        logger.error(
+            f"Chat request failed: correlation_id={correlation_id}, code={error.error.code}, error={str(e)}",
+            exc_info=status_code == 500
+        )
+        raise HTTPException(status_code=status_code, detail=error.dict(), headers=retry_after_headers(e))
+    
+    if coalesced:
+        logger.info(f"Chat request coalesced with an identical one in flight: correlation_id={correlation_id}")
+        return ChatResponse(
+            output_text=response.output_text,
+            meta={**(response.meta or {}), "correlation_id": correlation_id, "coalesced": True}
         )
+    
+    return response
 
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/agent/stream")
+async def chat_agent_stream(
+    request: ChatRequest,
+    http_request: Request
+) -> StreamingResponse:
+    """
+    Streaming variant of /agent that relays LangFlow tokens as Server-Sent Events.
+    
+    Emits ``token`` events with ``{"chunk": ...}`` as text is generated, then a single
+    ``end`` event carrying the full ChatResponse. Failures after the stream has started
+    are reported as an ``error`` event with the same ChatError body and codes as /agent.
+    """
+    correlation_id = getattr(http_request.state, 'correlation_id', generate_correlation_id())
+    
+    require_user_message(request, correlation_id)
+    
+    intent = fast_path_intent(request)
+    client = get_langflow_client() if intent is None else langflow_client
+    
+    # Shed load before committing to a 200 stream when the wait queue (or the session's) is already full
+    if intent is None and langflow_gate.saturated():
+        exc = OverloadedError("LangFlow wait queue is full", langflow_gate.retry_after)
+    elif session_locks.saturated(request.session_id):
+        exc = OverloadedError("A turn for this session is already running and another is waiting", session_locks.retry_after)
+    else:
+        exc = None
+    if exc is not None:
+        status_code, error = langflow_error(exc, correlation_id)
+        raise HTTPException(status_code=status_code, detail=error.dict(), headers=retry_after_headers(exc))
+    
+    async def event_stream():
+        start_time = time.time()
+        chunks: List[str] = []
+        
+        async with AsyncExitStack() as session_lock:
+            try:
+                # Inside the try, so a turn shed while waiting for the session ends with an error event
+                await session_lock.enter_async_context(session_locks.hold(request.session_id))
+                messages, new_messages = await resolve_conversation(request)
+                
+                logger.info(
+                    f"Streaming chat request received: correlation_id={correlation_id}, "
+                    f"session_id={request.session_id}, message_count={len(messages)}"
+                )
+                
+                if intent is not None:
+                    chunks.append(await answer_intent(*intent))
+                    yield format_sse("token", {"chunk": chunks[0]})
+                else:
+                    async with langflow_gate.slot():
+                        with track_langflow_call("agent_stream"):
+                            async for chunk in client.stream_message(
+                                messages=messages,
+                                session_id=request.session_id,
+                                correlation_id=correlation_id
+                            ):
+                                chunks.append(chunk)
+                                yield format_sse("token", {"chunk": chunk})
+            
+            except Exception as e:
+                _, error = langflow_error(e, correlation_id)
+                logger.error(f"Streaming chat failed: correlation_id={correlation_id}, code={error.error.code}, error={str(e)}")
+                yield format_sse("error", error.dict())
+                return
+            
+            output_text = "".join(chunks)
+            logger.info(
+                f"Streaming chat response successful: correlation_id={correlation_id}, "
+                f"session_id={request.session_id}, response_length={len(output_text)}"
+            )
+            await record_turn(request.session_id, new_messages, output_text)
+        
+        yield format_sse("end", ChatResponse(
+            output_text=output_text,
+            meta={
+                "session_id": request.session_id,
+                "correlation_id": correlation_id,
+                "response_time_ms": int((time.time() - start_time) * 1000),
+                **({"fast_path": intent[0]} if intent is not None else {"flow_id": client.flow_id})
+            }
+        ).dict())
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "X-Correlation-ID": correlation_id,
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+async def run_chat_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Run an /agent/jobs turn on whichever process's job worker picked it up."""
+    request = ChatRequest(**payload["request"])
+    correlation_id = payload["correlation_id"]
+    try:
+        if langflow_client is None and fast_path_intent(request) is None:
+            raise RuntimeError("LangFlow client not initialized")
+        chat_response = await run_chat_turn(request, langflow_client, correlation_id)
+    except Exception as e:
+        # Report the same error codes /agent responds with
+        _, error = langflow_error(e, correlation_id)
+        raise JobFailed(error.error.dict()) from e
+    return chat_response.dict()
+
+
+@app.post("/agent/jobs", response_model=ChatJob, status_code=202)
+async def create_agent_job(
+    request: ChatJobRequest,
+    http_request: Request,
+    response: Response
+) -> ChatJob:
+    """
+    Queue an /agent turn to run in the background and return its job id straight away.
+    
+    Poll ``GET /agent/jobs/{job_id}`` for the result, or pass ``webhook_url`` to have
+    the finished job POSTed there. The client connection is not held open while
+    LangFlow runs, so slow flows are not cut off by proxy timeouts.
+    """
+    correlation_id = getattr(http_request.state, 'correlation_id', generate_correlation_id())
+    
+    require_user_message(request, correlation_id)
+    langflow_client_for(request)
+    
+    payload = {"request": request.dict(exclude={"webhook_url"}), "correlation_id": correlation_id}
+    try:
+        job = await agent_jobs.submit(payload, str(request.webhook_url) if request.webhook_url else None)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        # Shutting down: the job would not be run
+        raise HTTPException(status_code=503, detail=str(e))
+    except OverloadedError as e:
+        status_code, error = langflow_error(e, correlation_id)
+        raise HTTPException(status_code=status_code, detail=error.dict(), headers=retry_after_headers(e))
+    
+    logger.info(f"Chat job queued: correlation_id={correlation_id}, job_id={job.id}, session_id={request.session_id}")
+    response.headers["Location"] = f"/agent/jobs/{job.id}"
+    return ChatJob(**job.to_dict())
+
+
+@app.get("/agent/jobs/{job_id}", response_model=ChatJob)
+async def read_agent_job(job_id: str) -> ChatJob:
+    """Status of a background agent job, with its result or error once finished."""
+    job = await agent_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return ChatJob(**job.to_dict())
+
+
+@app.post("/agent/tools", response_model=ToolBatchResponse)
+async def run_agent_tools(
+    request: ToolBatchRequest,
+    db: Optional[AsyncSession] = Depends(get_optional_async_db),
+) -> ToolBatchResponse:
+    """
+    Run all the read-only loan tool calls of one agent turn in a single request.
+    
+    Each call is ``{"tool": "read_loan" | "price_loan", "loan_id": ...}`` or
+    ``{"tool": "calculate_rate", "income": ..., "loan_amount": ..., "duration": ...}``.
+    Results come back in call order; a failed call does not fail the others.
+    """
+    results = []
+    for call in request.calls:
+        if call.tool == "calculate_rate":
+            results.append(ToolResult(tool=call.tool, ok=True, result=quote_loan(call.income, call.loan_amount, call.duration)))
+            continue
+        
+        if db is None:
+            results.append(ToolResult(tool=call.tool, ok=False, error="Database not configured"))
+            continue
+        loan = await load_loan(db, call.loan_id)
+        if loan is None:
+            results.append(ToolResult(tool=call.tool, ok=False, error=f"Loan application {call.loan_id} not found"))
+        elif call.tool == "read_loan":
+            results.append(ToolResult(tool=call.tool, ok=True, result=loan))
+        else:
+            quote = quote_stored_loan(loan)
+            if quote is None:
+                results.append(ToolResult(tool=call.tool, ok=False, error=f"Loan application {call.loan_id} cannot be priced"))
+            else:
+                results.append(ToolResult(tool=call.tool, ok=True, result={"loan_id": call.loan_id, **quote}))
+    return ToolBatchResponse(results=results)
+
+
+@app.delete("/agent/sessions/{session_id}")
+async def clear_session(session_id: str):
+    """Forget the server-side conversation history of a session."""
+    await session_store.clear(session_id)
+    return {"message": f"Session {session_id} cleared"}
+
 from fastapi.middleware.cors import CORSMiddleware
 
 app.add_middleware(
@@ -454,14 +1555,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id"],
 )
 
+startup.mark("import")
+
 if __name__ == "__main__":
+    # Single-process server for development; production runs `python -m app.serve`
     import uvicorn
     
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(
-        "main:app",
+        "app.main:app",
         host="0.0.0.0",
         port=port,
         reload=os.getenv("ENVIRONMENT") == "development"
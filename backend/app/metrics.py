@@ -0,0 +1,310 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds) shared by the HTTP, LangFlow and DB histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (name, labels, value) rows produced by a collector at scrape time
+Sample = Tuple[str, Dict[str, str], float]
+# (name, type, help, samples): one metric family as rendered
+Family = Tuple[str, str, str, List[Sample]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+    
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    type = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+    
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (last slot is +Inf), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+    
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+    
+    def samples(self) -> List[Sample]:
+        rows: List[Sample] = []
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                rows.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            rows.append((f"{self.name}_count", labels, cumulative))
+            rows.append((f"{self.name}_sum", labels, total))
+        return rows
+
+
+class MetricsRegistry:
+    """
+    Holds metrics and renders them in the Prometheus text exposition format.
+    
+    Collectors are callables run at scrape time for values that are read from
+    elsewhere (pool stats, gate counters) instead of being updated in place.
+    """
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+    
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+    
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]) -> None:
+        """Register ``collector() -> [(name, type, help, samples), ...]``."""
+        self._collectors.append(collector)
+    
+    def families(self) -> List[Family]:
+        families = [(metric.name, metric.type, metric.documentation, metric.samples()) for metric in self._metrics]
+        for collector in self._collectors:
+            families.extend(collector())
+        return families
+    
+    def render(self) -> str:
+        return render_families(self.families())
+
+
+def render_families(families: Iterable[Family]) -> str:
+    lines: List[str] = []
+    for name, metric_type, documentation, samples in families:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for sample_name, labels, value in samples:
+            lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MultiProcessMetrics:
+    """
+    Aggregates a registry across worker processes through a directory they share.
+    
+    Each process writes its families to ``<directory>/<pid>.json``, every ``interval``
+    seconds and whenever it is scraped, so a scrape of any one worker reports them all:
+    counters and histograms are summed over every file, including those of exited
+    workers so totals never go backwards, and gauges are reported per live process
+    with a ``pid`` label. Other workers' values are up to ``interval`` seconds old.
+    The directory must be emptied before the server starts (``app.serve`` does this).
+    """
+    
+    def __init__(self, registry: MetricsRegistry, directory: str, interval: float = 5.0):
+        self.registry = registry
+        self.directory = Path(directory)
+        self.interval = interval
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def write(self) -> None:
+        """Write this process's current families, atomically replacing its previous file."""
+        path = self.directory / f"{os.getpid()}.json"
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(self.registry.families()))
+        os.replace(temp_path, path)
+    
+    async def run(self) -> None:
+        """Write every ``interval`` seconds until cancelled."""
+        while True:
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"Failed to write metrics to {self.directory}: {str(e)}")
+            await asyncio.sleep(self.interval)
+    
+    def collect(self) -> List[Family]:
+        self.write()
+        merged: Dict[str, Tuple[str, str, Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]]] = {}
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                pid = int(path.stem)
+                families = json.loads(path.read_text())
+            except (ValueError, OSError):
+                continue
+            alive = _process_alive(pid)
+            for name, metric_type, documentation, samples in families:
+                if metric_type not in ("counter", "histogram"):
+                    if not alive:
+                        continue
+                    samples = [(sample_name, {**labels, "pid": str(pid)}, value) for sample_name, labels, value in samples]
+                _, _, values = merged.setdefault(name, (metric_type, documentation, {}))
+                for sample_name, labels, value in samples:
+                    key = (sample_name, tuple(labels.items()))
+                    values[key] = values.get(key, 0) + value
+        return [
+            (name, metric_type, documentation, [(sample_name, dict(labels), value) for (sample_name, labels), value in values.items()])
+            for name, (metric_type, documentation, values) in merged.items()
+        ]
+    
+    def render(self) -> str:
+        return render_families(self.collect())
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests handled, by route template and status.", ("method", "route", "status")
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency, by route template and status.", ("method", "route", "status")
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled."
+))
+LANGFLOW_LATENCY = REGISTRY.register(Histogram(
+    "langflow_request_duration_seconds", "LangFlow call latency including retries, by outcome.", ("endpoint", "outcome")
+))
+LANGFLOW_ERRORS = REGISTRY.register(Counter(
+    "langflow_errors_total", "Failed LangFlow calls, by API error code.", ("endpoint", "code")
+))
+AGENT_FAST_PATH_TURNS = REGISTRY.register(Counter(
+    "agent_fast_path_total", "Agent turns answered in-process without calling LangFlow, by intent.", ("intent",)
+))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Time spent executing SQL statements, by engine.", ("engine",)
+))
+
+
+def instrument_engine(db_engine, label: str) -> None:
+    """Time every statement executed on a (sync) SQLAlchemy engine into DB_QUERY_LATENCY."""
+    if db_engine is None:
+        return
+    
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+    
+    @event.listens_for(db_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            DB_QUERY_LATENCY.observe(time.perf_counter() - starts.pop(), engine=label)
+    
+    @event.listens_for(db_engine, "handle_error")
+    def _drop_timer(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get("metrics_query_start") if conn is not None else None
+        if starts:
+            DB_QUERY_LATENCY.observe(time.perf_counter() - starts.pop(), engine=label)
+
+
+def gauge_family(name: str, documentation: str, samples: List[Sample]) -> Tuple[str, str, str, List[Sample]]:
+    """Build a gauge family for a collector."""
+    return name, "gauge", documentation, samples
+
+
+def counter_family(name: str, documentation: str, samples: List[Sample]) -> Tuple[str, str, str, List[Sample]]:
+    """Build a counter family for a collector."""
+    return name, "counter", documentation, samples
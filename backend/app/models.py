@@ -0,0 +1,64 @@
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Numeric, func
+
+from app.database import Base
+
+
+# === SQLAlchemy ORM Models ===
+class LoanApplication(Base):
+    __tablename__ = "LoanApplication"
+
+    id = Column(Integer, primary_key=True, index=True)
+    applicationdate = Column(Date, index=True)
+    age = Column(Integer, index=True)
+    annualincome = Column(Numeric(12, 2), index=True)
+    creditscore = Column(Numeric(5, 2), index=True)
+    employmentstatus = Column(String)
+    educationlevel = Column(String)
+    experience = Column(Integer)
+    loanamount = Column(Numeric(12, 2), index=True)
+    loanduration = Column(Integer)
+    maritalstatus = Column(String)
+    numberofdependents = Column(Integer)
+    homeownershipstatus = Column(String)
+    monthlydebtpayments = Column(Numeric(12, 2))
+    creditcardutilizationrate = Column(Numeric(5, 4))
+    numberofopencreditlines = Column(Integer)
+    numberofcreditinquiries = Column(Integer)
+    debttoincomeratio = Column(Numeric(5, 4), index=True)
+    bankruptcyhistory = Column(Boolean)
+    loanpurpose = Column(String)
+    previousloandefaults = Column(Boolean)
+    paymenthistory = Column(String)
+    lengthofcredithistory = Column(Integer)
+    savingsaccountbalance = Column(Numeric(12, 2))
+    checkingaccountbalance = Column(Numeric(12, 2))
+    totalassets = Column(Numeric(14, 2))
+    totalliabilities = Column(Numeric(14, 2))
+    monthlyincome = Column(Numeric(12, 2))
+    utilitybillspaymenthistory = Column(String)
+    jobtenure = Column(Integer)
+    networth = Column(Numeric(14, 2))
+    baseinterestrate = Column(Numeric(5, 3))
+    interestrate = Column(Numeric(5, 3), index=True)
+    monthlyloanpayment = Column(Numeric(12, 2))
+    totaldebttoincomeratio = Column(Numeric(5, 4))
+    loanapproved = Column(Boolean)
+    riskscore = Column(Numeric(5, 2), index=True)
+    # Model that computed the scored columns, None for client-supplied values
+    scoringversion = Column(String)
+
+
+
+class ImportCheckpoint(Base):
+    """Progress of a CSV import, committed in the same transaction as each batch."""
+    __tablename__ = "loan_import_checkpoint"
+
+    source = Column(String, primary_key=True)
+    rows_done = Column(Integer, nullable=False, default=0)
+    rows_inserted = Column(Integer, nullable=False, default=0)
+    rows_rejected = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# Columns that may be requested through the ``fields=`` projection parameter
+LOAN_COLUMNS = {column.name: column for column in LoanApplication.__table__.columns}
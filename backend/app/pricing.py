@@ -0,0 +1,46 @@
+import math
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+# Toy pricing model: base rate plus loan-to-income and term loadings (percent)
+BASE_RATE = 3.5
+LOAN_TO_INCOME_FACTOR = 0.1
+DURATION_FACTOR_PER_YEAR = 0.05
+
+
+def calculate_rate(income: float, loan_amount: float, duration: int) -> float:
+    """Interest rate (percent) for a single loan."""
+    risk_factor = (loan_amount / income) * LOAN_TO_INCOME_FACTOR
+    duration_factor = (duration / 12) * DURATION_FACTOR_PER_YEAR
+    return BASE_RATE + risk_factor + duration_factor
+
+
+def calculate_rates(income: np.ndarray, loan_amount: np.ndarray, duration: np.ndarray) -> np.ndarray:
+    """Vectorised calculate_rate over equally-shaped arrays."""
+    return (
+        BASE_RATE
+        + (loan_amount / income) * LOAN_TO_INCOME_FACTOR
+        + (duration / 12) * DURATION_FACTOR_PER_YEAR
+    )
+
+
+def monthly_payments(principal: np.ndarray, annual_rate: np.ndarray, duration: np.ndarray) -> np.ndarray:
+    """Amortised monthly payment for annual rates in percent and durations in months."""
+    monthly_rate = annual_rate / 100 / 12
+    # Zero-rate loans degrade to straight-line repayment
+    growth = np.power(1 + monthly_rate, -duration)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortised = principal * monthly_rate / (1 - growth)
+    return np.where(monthly_rate == 0, principal / duration, amortised)
+
+
+def debt_to_income(monthly_debt: np.ndarray, monthly_payment: np.ndarray, monthly_income: np.ndarray) -> np.ndarray:
+    """Total debt-to-income ratio including the new loan payment."""
+    return (monthly_debt + monthly_payment) / monthly_income
+
+
+def to_json_floats(values: np.ndarray, ndigits: int) -> List[Optional[float]]:
+    """Round and convert to a JSON-safe list, mapping NaN/inf to None."""
+    rounded: Iterable[float] = np.round(values, ndigits).tolist()
+    return [value if math.isfinite(value) else None for value in rounded]
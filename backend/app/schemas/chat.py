@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, validator, model_validator
 from typing import List, Optional, Dict, Any, Literal
 import uuid
 
@@ -10,7 +10,10 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     session_id: str = Field(..., min_length=1, max_length=100)
-    messages: List[ChatMessage] = Field(..., min_items=1, max_items=50)
+    # Either the full history (legacy clients) or just the new user message,
+    # in which case the history is kept server-side per session_id
+    messages: Optional[List[ChatMessage]] = Field(None, min_items=1, max_items=50)
+    message: Optional[str] = Field(None, min_length=1, max_length=10000)
     
     @validator('session_id')
     def validate_session_id(cls, v):
@@ -23,6 +26,12 @@ class ChatRequest(BaseModel):
             if not v.replace('-', '').replace('_', '').isalnum():
                 raise ValueError('session_id must be UUID or alphanumeric')
             return v
+    
+    @model_validator(mode="after")
+    def validate_input(self):
+        if (self.messages is None) == (self.message is None):
+            raise ValueError("Provide either 'message' (server-side history) or 'messages' (full history)")
+        return self
 
 
 class ChatResponse(BaseModel):
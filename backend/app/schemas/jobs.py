@@ -0,0 +1,28 @@
+from pydantic import AnyHttpUrl, BaseModel
+from typing import Any, Dict, Literal, Optional
+
+from app.schemas.chat import ChatRequest, ChatResponse
+
+
+class ChatJobRequest(ChatRequest):
+    # POSTed the finished job, in addition to it being available from GET /agent/jobs/{job_id};
+    # the host must resolve to public addresses (and be in JOBS_WEBHOOK_ALLOWED_HOSTS when set)
+    webhook_url: Optional[AnyHttpUrl] = None
+
+
+class JobError(BaseModel):
+    # The /agent error body for failed turns; jobs interrupted by shutdown have no correlation id
+    detail: str
+    code: str
+    correlation_id: Optional[str] = None
+
+
+class ChatJob(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ChatResponse] = None
+    error: Optional[JobError] = None
+    webhook: Optional[Dict[str, Any]] = None
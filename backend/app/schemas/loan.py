@@ -0,0 +1,68 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+from datetime import date
+
+
+def numeric_field(precision: int, scale: int, default: Any = ...) -> Any:
+    """A float bounded to what a Numeric(precision, scale) column holds once rounded to ``scale`` places."""
+    bound = 10 ** (precision - scale) - 5 * 10 ** -(scale + 1)
+    return Field(default, gt=-bound, lt=bound)
+
+
+class LoanApplicationCreate(BaseModel):
+    applicationdate: Optional[date]
+    age: int
+    annualincome: float = numeric_field(12, 2)
+    creditscore: float = numeric_field(5, 2)
+    employmentstatus: str
+    educationlevel: str
+    experience: int
+    loanamount: float = numeric_field(12, 2)
+    loanduration: int
+    maritalstatus: str
+    numberofdependents: int
+    homeownershipstatus: str
+    monthlydebtpayments: float = numeric_field(12, 2)
+    creditcardutilizationrate: float = numeric_field(5, 4)
+    numberofopencreditlines: int
+    numberofcreditinquiries: int
+    debttoincomeratio: float = numeric_field(5, 4)
+    bankruptcyhistory: bool
+    loanpurpose: str
+    previousloandefaults: bool
+    paymenthistory: str
+    lengthofcredithistory: int
+    savingsaccountbalance: float = numeric_field(12, 2)
+    checkingaccountbalance: float = numeric_field(12, 2)
+    totalassets: float = numeric_field(14, 2)
+    totalliabilities: float = numeric_field(14, 2)
+    monthlyincome: float = numeric_field(12, 2)
+    utilitybillspaymenthistory: str
+    jobtenure: int
+    networth: float = numeric_field(14, 2)
+    baseinterestrate: float = numeric_field(5, 3)
+    # Computed server-side by app.scoring unless LOAN_SCORING=false
+    interestrate: Optional[float] = numeric_field(5, 3, default=None)
+    monthlyloanpayment: Optional[float] = numeric_field(12, 2, default=None)
+    totaldebttoincomeratio: Optional[float] = numeric_field(5, 4, default=None)
+    loanapproved: bool
+    riskscore: Optional[float] = numeric_field(5, 2, default=None)
+
+    class Config:
+        from_attributes = True
+
+
+class LoanApplicationRead(LoanApplicationCreate):
+    id: int
+    scoringversion: Optional[str] = None
+
+
+class BulkLoanRowError(BaseModel):
+    row: int
+    errors: List[Dict[str, Any]]
+
+
+class BulkLoanResult(BaseModel):
+    inserted: int
+    ids: List[int]
+    errors: List[BulkLoanRowError]
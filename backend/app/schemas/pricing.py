@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+
+class RateBatchRequest(BaseModel):
+    """Either parallel arrays of loan parameters, or ids of stored loan applications."""
+    income: Optional[List[float]] = None
+    loan_amount: Optional[List[float]] = None
+    duration: Optional[List[int]] = None
+    monthly_debt: Optional[List[float]] = None
+    loan_ids: Optional[List[int]] = Field(None, max_length=100000)
+
+    @model_validator(mode="after")
+    def validate_shape(self):
+        arrays = [self.income, self.loan_amount, self.duration]
+        if self.loan_ids is not None:
+            if any(array is not None for array in arrays):
+                raise ValueError("Provide either loan_ids or income/loan_amount/duration, not both")
+            return self
+        
+        if any(array is None for array in arrays):
+            raise ValueError("income, loan_amount and duration are required when loan_ids is not given")
+        lengths = {len(array) for array in arrays + ([self.monthly_debt] if self.monthly_debt is not None else [])}
+        if len(lengths) != 1:
+            raise ValueError("income, loan_amount, duration and monthly_debt must have the same length")
+        if lengths.pop() > 100000:
+            raise ValueError("At most 100000 loans can be priced per request")
+        return self
+
+
+class RateBatchResponse(BaseModel):
+    loan_ids: Optional[List[int]] = None
+    missing_ids: Optional[List[int]] = None
+    calculated_rate: List[Optional[float]]
+    monthly_payment: List[Optional[float]]
+    debt_to_income_ratio: List[Optional[float]]
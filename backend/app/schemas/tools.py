@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+
+
+class ReadLoanCall(BaseModel):
+    tool: Literal["read_loan"]
+    loan_id: int
+
+
+class PriceLoanCall(BaseModel):
+    tool: Literal["price_loan"]
+    loan_id: int
+
+
+class CalculateRateCall(BaseModel):
+    tool: Literal["calculate_rate"]
+    income: float = Field(..., gt=0)
+    loan_amount: float = Field(..., gt=0)
+    duration: int = Field(..., gt=0)
+
+
+ToolCall = Annotated[Union[ReadLoanCall, PriceLoanCall, CalculateRateCall], Field(discriminator="tool")]
+
+
+class ToolBatchRequest(BaseModel):
+    """The loan tool calls of one agent turn, run in order."""
+    calls: List[ToolCall] = Field(..., min_length=1, max_length=50)
+
+
+class ToolResult(BaseModel):
+    tool: str
+    ok: bool
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class ToolBatchResponse(BaseModel):
+    results: List[ToolResult]
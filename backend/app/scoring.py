@@ -0,0 +1,202 @@
+"""
+Server-side risk scoring for loan applications.
+
+Derives ``riskscore``, ``interestrate``, ``monthlyloanpayment`` and
+``totaldebttoincomeratio`` from the applicant columns, vectorised over a batch
+of rows, and stamps each row with ``scoringversion``. The API scores rows as
+they are written; existing rows are backfilled in id-ordered chunks with:
+
+    python -m app.scoring [--chunk-size 5000] [--all]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app import pricing
+from app.database import engine_options, make_async_database_url
+from app.models import LoanApplication, LOAN_COLUMNS
+
+logger = logging.getLogger("app.scoring")
+
+# Bump whenever the weights or formulas below change, so a backfill re-scores every row
+MODEL_VERSION = "risk-v1"
+
+# Applicant columns the model reads
+SCORING_INPUTS = (
+    "annualincome", "monthlyincome", "creditscore", "employmentstatus", "loanamount", "loanduration",
+    "monthlydebtpayments", "creditcardutilizationrate", "numberofcreditinquiries", "debttoincomeratio",
+    "bankruptcyhistory", "previousloandefaults", "lengthofcredithistory", "networth", "baseinterestrate",
+)
+SCORED_COLUMNS = ("riskscore", "interestrate", "monthlyloanpayment", "totaldebttoincomeratio", "scoringversion")
+
+# Risk points (0 = safest, 100 = riskiest) start from NEUTRAL_RISK and move per factor
+NEUTRAL_RISK = 50.0
+NEUTRAL_CREDIT_SCORE = 700.0
+POINTS_PER_CREDIT_SCORE = 0.08
+POINTS_PER_DTI = 20.0
+POINTS_PER_UTILIZATION = 10.0
+POINTS_PER_LOAN_TO_INCOME = 3.0
+MAX_LOAN_TO_INCOME = 5.0
+POINTS_PER_INQUIRY = 1.0
+MAX_INQUIRIES = 10.0
+POINTS_PER_HISTORY_YEAR = -0.3
+MAX_HISTORY_YEARS = 30.0
+BANKRUPTCY_POINTS = 10.0
+DEFAULT_POINTS = 8.0
+NEGATIVE_NET_WORTH_POINTS = 5.0
+EMPLOYMENT_POINTS = {"unemployed": 8.0, "self-employed": 3.0}
+
+# Interest rates are fractions, like the stored baseinterestrate: base plus a risk spread
+DEFAULT_BASE_RATE = 0.05
+RISK_RATE_SPREAD = 0.15
+
+# Largest values the Numeric columns can hold
+MAX_TOTAL_DTI = 9.9999
+
+
+def _column(rows: Sequence[Mapping[str, Any]], name: str) -> np.ndarray:
+    """One input column as floats, with None as NaN (and booleans as 0/1)."""
+    return np.array([float(row[name]) if row.get(name) is not None else np.nan for row in rows], dtype=float)
+
+
+def score_arrays(inputs: Dict[str, np.ndarray], employment: np.ndarray) -> Dict[str, np.ndarray]:
+    """Scored columns for equally-shaped input arrays; ``employment`` holds lower-cased statuses."""
+    credit = np.nan_to_num(inputs["creditscore"], nan=NEUTRAL_CREDIT_SCORE)
+    dti = np.nan_to_num(inputs["debttoincomeratio"])
+    utilization = np.nan_to_num(inputs["creditcardutilizationrate"])
+    inquiries = np.minimum(np.nan_to_num(inputs["numberofcreditinquiries"]), MAX_INQUIRIES)
+    history = np.minimum(np.nan_to_num(inputs["lengthofcredithistory"]), MAX_HISTORY_YEARS)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loan_to_income = np.clip(np.nan_to_num(inputs["loanamount"] / inputs["annualincome"], nan=0.0), 0, MAX_LOAN_TO_INCOME)
+    
+    risk = (
+        NEUTRAL_RISK
+        + (NEUTRAL_CREDIT_SCORE - credit) * POINTS_PER_CREDIT_SCORE
+        + dti * POINTS_PER_DTI
+        + utilization * POINTS_PER_UTILIZATION
+        + loan_to_income * POINTS_PER_LOAN_TO_INCOME
+        + inquiries * POINTS_PER_INQUIRY
+        + history * POINTS_PER_HISTORY_YEAR
+        + np.nan_to_num(inputs["bankruptcyhistory"]) * BANKRUPTCY_POINTS
+        + np.nan_to_num(inputs["previousloandefaults"]) * DEFAULT_POINTS
+        + (np.nan_to_num(inputs["networth"]) < 0) * NEGATIVE_NET_WORTH_POINTS
+        + np.select([employment == status for status in EMPLOYMENT_POINTS], list(EMPLOYMENT_POINTS.values()), 0.0)
+    )
+    risk = np.clip(risk, 0, 100)
+    
+    rate = np.where(np.isnan(inputs["baseinterestrate"]), DEFAULT_BASE_RATE, inputs["baseinterestrate"]) + RISK_RATE_SPREAD * risk / 100
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = pricing.monthly_payments(inputs["loanamount"], rate * 100, inputs["loanduration"])
+        monthly_income = np.where(
+            np.isnan(inputs["monthlyincome"]) | (inputs["monthlyincome"] <= 0),
+            inputs["annualincome"] / 12,
+            inputs["monthlyincome"]
+        )
+        total_dti = pricing.debt_to_income(np.nan_to_num(inputs["monthlydebtpayments"]), payment, monthly_income)
+    
+    return {
+        "riskscore": risk,
+        "interestrate": rate,
+        "monthlyloanpayment": payment,
+        "totaldebttoincomeratio": np.minimum(total_dti, MAX_TOTAL_DTI),
+    }
+
+
+def score_records(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Score a batch of loan rows in place (values that cannot be computed become None)."""
+    if not rows:
+        return rows
+    
+    inputs = {name: _column(rows, name) for name in SCORING_INPUTS if name != "employmentstatus"}
+    employment = np.array([str(row.get("employmentstatus") or "").strip().lower() for row in rows])
+    scores = score_arrays(inputs, employment)
+    
+    columns = {
+        name: pricing.to_json_floats(scores[name], LOAN_COLUMNS[name].type.scale)
+        for name in ("riskscore", "interestrate", "monthlyloanpayment", "totaldebttoincomeratio")
+    }
+    for index, row in enumerate(rows):
+        for name, values in columns.items():
+            row[name] = values[index]
+        row["scoringversion"] = MODEL_VERSION
+    return rows
+
+
+async def backfill(db_engine: AsyncEngine, chunk_size: int = 5000, rescore_all: bool = False) -> int:
+    """
+    Re-score stored applications in id order, one committed chunk at a time.
+    
+    Only rows scored by another model version (or never) are touched unless
+    ``rescore_all``, so an interrupted backfill simply picks up where it stopped.
+    Returns the number of rows updated.
+    """
+    columns = [LoanApplication.id, *[LOAN_COLUMNS[name] for name in SCORING_INPUTS]]
+    stale = or_(LoanApplication.scoringversion.is_(None), LoanApplication.scoringversion != MODEL_VERSION)
+    updated = 0
+    last_id = 0
+    start_time = time.time()
+    
+    async with AsyncSession(db_engine) as db:
+        while True:
+            stmt = select(*columns).where(LoanApplication.id > last_id)
+            if not rescore_all:
+                stmt = stmt.where(stale)
+            result = await db.execute(stmt.order_by(LoanApplication.id).limit(chunk_size))
+            rows = [dict(row._mapping) for row in result]
+            if not rows:
+                break
+            
+            score_records(rows)
+            await db.execute(
+                update(LoanApplication),
+                [{"id": row["id"], **{name: row[name] for name in SCORED_COLUMNS}} for row in rows]
+            )
+            await db.commit()
+            
+            updated += len(rows)
+            last_id = rows[-1]["id"]
+            elapsed = time.time() - start_time
+            logger.info(f"Scored {updated} rows (last id {last_id}), rows_per_sec={updated / elapsed if elapsed else 0.0:.0f}")
+    
+    logger.info(f"Backfill with {MODEL_VERSION} complete: rows={updated}, elapsed={time.time() - start_time:.1f}s")
+    return updated
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=f"Backfill loan risk scores with model {MODEL_VERSION}.")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), help="Defaults to $DATABASE_URL")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per read/update/commit (default 5000)")
+    parser.add_argument("--all", action="store_true", help="Re-score rows already scored by this model version too")
+    args = parser.parse_args(argv)
+    
+    if not args.database_url:
+        parser.error("DATABASE_URL is not set and --database-url was not given")
+    
+    async def run():
+        url = make_async_database_url(args.database_url)
+        db_engine = create_async_engine(url, **engine_options(url, is_async=True))
+        try:
+            await backfill(db_engine, chunk_size=args.chunk_size, rescore_all=args.all)
+        finally:
+            await db_engine.dispose()
+    
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Production launcher: uvicorn worker processes under gunicorn.
+
+    cd backend
+    python -m app.serve [--workers 8] [--port 8000]
+
+which is the same as ``gunicorn -c gunicorn.conf.py app.main:app``. Workers use
+uvloop and httptools when they are installed (``uvicorn[standard]``). Send the
+master SIGHUP to replace every worker without dropping connections: new workers
+start on the same socket while the old ones finish their in-flight requests.
+Without gunicorn (e.g. on Windows) this falls back to ``uvicorn --workers``,
+which restarts workers on SIGHUP but not gracefully.
+
+Caches, sessions and background jobs live in each worker's memory unless Redis
+backs them, so more than one worker is refused until all three are shared.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+APP = "app.main:app"
+GUNICORN_CONFIG = Path(__file__).resolve().parent.parent / "gunicorn.conf.py"
+
+# Per-process state that requests routed to different workers must see the same way:
+# loan/agent replies (and their invalidation), conversation history together with the
+# lock that runs one turn per session at a time, and /agent/jobs
+SHARED_BACKENDS = ("CACHE_BACKEND", "SESSION_BACKEND", "JOBS_BACKEND")
+
+
+def cpu_count() -> int:
+    """CPUs this process may run on (respecting container/affinity limits where the OS reports them)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def per_process_backends() -> List[str]:
+    """Those of SHARED_BACKENDS still on the in-process ``memory`` backend."""
+    return [name for name in SHARED_BACKENDS if os.getenv(name, "memory") == "memory"]
+
+
+def default_workers() -> int:
+    """
+    WEB_CONCURRENCY if set; else one worker per CPU (async workers are not blocked by
+    slow I/O) once caches, sessions and jobs are shared, and a single worker until then.
+    """
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.getenv("WEB_CONCURRENCY")))
+    return 1 if per_process_backends() else cpu_count()
+
+
+def check_workers(workers: int) -> None:
+    """Raise ValueError for several workers while any of them would keep its own cache, sessions or jobs."""
+    memory_backends = per_process_backends()
+    if workers > 1 and memory_backends:
+        settings = ", ".join(f"{name}=redis" for name in memory_backends)
+        raise ValueError(
+            f"{workers} workers would each keep their own in-memory state "
+            f"(jobs polled on another worker 404, sessions split and their turns run concurrently, "
+            f"invalidation reaching one worker); "
+            f"set {settings} or run a single worker"
+        )
+
+
+def reset_metrics_dir() -> None:
+    """Empty METRICS_MULTIPROC_DIR, so /metrics does not add in counts from a previous run."""
+    directory = os.getenv("METRICS_MULTIPROC_DIR")
+    if not directory:
+        return
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for item in path.glob("*.json"):
+        item.unlink()
+
+
+def uvicorn_worker_class() -> str:
+    """Gunicorn worker class running uvicorn, preferring the maintained uvicorn-worker package."""
+    try:
+        import uvicorn_worker  # noqa: F401
+        return "uvicorn_worker.UvicornWorker"
+    except ImportError:
+        return "uvicorn.workers.UvicornWorker"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the API with multiple worker processes.")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument(
+        "--workers", type=int, default=default_workers(),
+        help="Defaults to $WEB_CONCURRENCY, else the CPU count with Redis-backed caches, sessions and jobs, else 1"
+    )
+    args = parser.parse_args(argv)
+    try:
+        check_workers(args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    try:
+        from gunicorn.app.wsgiapp import run
+    except ImportError:
+        import uvicorn
+        
+        reset_metrics_dir()
+        uvicorn.run(
+            APP,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            loop="auto",
+            http="auto",
+            timeout_keep_alive=int(os.getenv("GUNICORN_KEEPALIVE", 5)),
+            timeout_graceful_shutdown=int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30)),
+        )
+        return 0
+    
+    sys.argv = [
+        "gunicorn",
+        "--config", str(GUNICORN_CONFIG),
+        "--bind", f"{args.host}:{args.port}",
+        "--workers", str(args.workers),
+        APP,
+    ]
+    return run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import json
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from app.schemas.chat import ChatMessage
+
+
+class MemorySessionStore:
+    """In-process conversation history, evicting the least recently used sessions."""
+    
+    def __init__(self, max_sessions: int = 10000, max_messages: int = 100, ttl: float = 86400.0):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Tuple[float, List[ChatMessage]]]" = OrderedDict()
+    
+    async def get_history(self, session_id: str) -> List[ChatMessage]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return []
+        last_used, messages = entry
+        if last_used + self.ttl < time.monotonic():
+            del self._sessions[session_id]
+            return []
+        return list(messages)
+    
+    async def append(self, session_id: str, messages: List[ChatMessage]) -> None:
+        history = await self.get_history(session_id)
+        history.extend(messages)
+        self._sessions[session_id] = (time.monotonic(), history[-self.max_messages:])
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+    
+    async def clear(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+    
+    def size(self) -> int:
+        return len(self._sessions)
+    
+    async def aclose(self) -> None:
+        self._sessions.clear()
+
+
+class RedisSessionStore:
+    """Conversation history kept in a Redis list per session, shared across workers."""
+    
+    def __init__(self, url: str, max_messages: int = 100, ttl: float = 86400.0):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.max_messages = max_messages
+        self.ttl = ttl
+    
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"session:{session_id}"
+    
+    async def get_history(self, session_id: str) -> List[ChatMessage]:
+        items = await self._redis.lrange(self._key(session_id), 0, -1)
+        # Stored messages were validated on the way in (and replies may exceed the request limits)
+        return [ChatMessage.model_construct(**json.loads(item)) for item in items]
+    
+    async def append(self, session_id: str, messages: List[ChatMessage]) -> None:
+        key = self._key(session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *[json.dumps(msg.dict()) for msg in messages])
+            pipe.ltrim(key, -self.max_messages, -1)
+            pipe.expire(key, int(self.ttl))
+            await pipe.execute()
+    
+    async def clear(self, session_id: str) -> None:
+        await self._redis.delete(self._key(session_id))
+    
+    def size(self) -> Optional[int]:
+        return None
+    
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+def build_context_window(
+    messages: List[ChatMessage],
+    max_messages: int = 12,
+    max_chars: int = 12000
+) -> List[ChatMessage]:
+    """
+    Bound the history sent to LangFlow.
+    
+    Keeps the latest message plus as many preceding messages as fit in
+    ``max_messages`` and ``max_chars``; when older messages are dropped a short
+    system note records how many, so the agent knows the context is partial.
+    """
+    if not messages:
+        return []
+    
+    window = [messages[-1]]
+    used_chars = len(messages[-1].content)
+    for msg in reversed(messages[:-1]):
+        if len(window) >= max_messages or used_chars + len(msg.content) > max_chars:
+            break
+        window.append(msg)
+        used_chars += len(msg.content)
+    window.reverse()
+    
+    omitted = len(messages) - len(window)
+    if omitted:
+        window.insert(0, ChatMessage(role="system", content=f"[{omitted} earlier messages omitted]"))
+    return window
+
+
+def create_session_store(
+    backend: str = "memory",
+    url: Optional[str] = None,
+    max_sessions: int = 10000,
+    max_messages: int = 100,
+    ttl: float = 86400.0
+):
+    """Factory function to create the conversation session store."""
+    if backend == "memory":
+        return MemorySessionStore(max_sessions=max_sessions, max_messages=max_messages, ttl=ttl)
+    if backend == "redis":
+        if not url:
+            raise ValueError("SESSION_URL (or CACHE_URL) is required for the redis session backend")
+        return RedisSessionStore(url, max_messages=max_messages, ttl=ttl)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,175 @@
+"""
+Startup timing and per-subsystem readiness.
+
+``app.main`` imports this module first and records how long its own import took
+(``import``), then the lifespan times each step it runs before serving. Subsystems
+that initialise independently (the database, LangFlow) report their own state,
+which ``/health`` shows separately, so one failing does not hold up the others.
+
+    cd backend
+    python -m app.startup [--top 15]
+
+prints the slowest imports under ``app.main`` (from ``python -X importtime``),
+then runs the application's startup in-process and prints the phase timings.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("app.startup")
+
+PENDING = "pending"
+READY = "ready"
+UNAVAILABLE = "unavailable"
+DISABLED = "disabled"
+
+
+class StartupReport:
+    """Elapsed time of each startup phase, and the state of each subsystem."""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.serving_after: Optional[float] = None
+        self.subsystems: Dict[str, Dict[str, Any]] = {}
+    
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+    
+    def mark(self, name: str) -> None:
+        """Record a phase that ran from the creation of this report until now."""
+        self.phases[name] = round(self.elapsed(), 4)
+    
+    @contextmanager
+    def phase(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - start_time, 4)
+    
+    def set_state(self, subsystem: str, state: str, error: Optional[str] = None) -> None:
+        """Record a subsystem state; READY also records how long after startup it became ready."""
+        self.subsystems[subsystem] = {
+            "state": state,
+            "error": error,
+            "ready_after": round(self.elapsed(), 4) if state == READY else None,
+        }
+    
+    def state(self, subsystem: str) -> Optional[str]:
+        entry = self.subsystems.get(subsystem)
+        return entry["state"] if entry else None
+    
+    def ready(self) -> bool:
+        """Whether every subsystem that is not disabled is ready."""
+        return all(entry["state"] in (READY, DISABLED) for entry in self.subsystems.values())
+    
+    def status(self) -> str:
+        """Overall status: healthy once every subsystem is ready, starting while any is pending, else degraded."""
+        if self.ready():
+            return "healthy"
+        if any(entry["state"] == PENDING for entry in self.subsystems.values()):
+            return "starting"
+        return "degraded"
+    
+    def serving(self) -> None:
+        """Record that the application is accepting requests, and log the timings."""
+        self.serving_after = round(self.elapsed(), 4)
+        phases = ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.phases.items())
+        logger.info(f"Serving after {self.serving_after:.3f}s ({phases})")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"serving_after": self.serving_after, "phases": dict(self.phases)}
+
+
+# Created when app.main starts importing, so "import" covers everything it pulls in
+startup = StartupReport()
+
+
+def parse_importtime(output: str, module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Seconds to import ``module`` and its direct imports by cumulative seconds, slowest first,
+    from ``python -X importtime`` output (children are listed before their parent, one level deeper).
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1e6))
+    
+    for index, (depth, name, seconds) in enumerate(entries):
+        if name == module:
+            children = []
+            for child_depth, child_name, child_seconds in reversed(entries[:index]):
+                if child_depth <= depth:
+                    break
+                if child_depth == depth + 1:
+                    children.append((child_name, child_seconds))
+            return seconds, sorted(children, key=lambda item: item[1], reverse=True)
+    raise ValueError(f"{module} was not imported")
+
+
+def import_report(module: str = "app.main") -> Tuple[float, List[Tuple[str, float]]]:
+    """Import ``module`` in a fresh interpreter and break down where the time went."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr, module)
+
+
+async def lifespan_report(wait: float) -> Dict[str, Any]:
+    """Run the application's startup (and shutdown), waiting up to ``wait`` seconds for every subsystem."""
+    # Under ``python -m`` this module is __main__; the app records into the importable app.startup
+    from app.startup import startup as report
+    from app.main import app
+    
+    async with app.router.lifespan_context(app):
+        deadline = time.perf_counter() + wait
+        while not report.ready() and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        return {**report.to_dict(), "subsystems": dict(report.subsystems)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report where application startup time goes.")
+    parser.add_argument("--top", type=int, default=15, help="Direct imports of app.main to list (default 15)")
+    parser.add_argument("--wait", type=float, default=10.0, help="Seconds to wait for subsystems to become ready")
+    args = parser.parse_args(argv)
+    
+    total, children = import_report()
+    print(f"import app.main: {total:.3f}s (fresh interpreter, -X importtime)")
+    for name, seconds in children[:args.top]:
+        print(f"  {seconds:8.3f}s  {name}")
+    
+    report = asyncio.run(lifespan_report(args.wait))
+    print(f"\nserving after {report['serving_after']:.3f}s")
+    for name, seconds in report["phases"].items():
+        print(f"  {seconds:8.3f}s  {name}")
+    for name, entry in report["subsystems"].items():
+        detail = f" after {entry['ready_after']:.3f}s" if entry["ready_after"] is not None else ""
+        error = f" ({entry['error']})" if entry["error"] else ""
+        print(f"  {name}: {entry['state']}{detail}{error}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import logging
+from typing import Dict, Optional
+
+from opentelemetry import context, propagate, trace
+from opentelemetry.context import Context
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "lernout-hauspie-backend"
+
+# Statements longer than this are truncated on db spans
+MAX_STATEMENT_LENGTH = 2000
+
+# Spans go to whatever provider configure_tracing installed; without one the
+# OpenTelemetry API hands out no-op spans, so instrumentation costs next to nothing
+tracer = trace.get_tracer(SERVICE_NAME)
+
+
+def configure_tracing(
+    exporter: str = "none",
+    endpoint: Optional[str] = None,
+    file_path: Optional[str] = None,
+    service_name: str = SERVICE_NAME
+) -> bool:
+    """
+    Install an OpenTelemetry SDK tracer provider with the chosen exporter.
+    
+    ``exporter`` is ``none``, ``console``, ``file`` (one JSON span per line at
+    ``file_path``) or ``otlp`` (OTLP/HTTP to ``endpoint``, e.g. a local collector).
+    Returns whether tracing was enabled.
+    """
+    exporter = (exporter or "none").lower()
+    if exporter == "none":
+        return False
+    
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError as e:
+        raise RuntimeError("TRACING_EXPORTER requires the 'opentelemetry-sdk' package") from e
+    
+    if exporter == "console":
+        span_exporter = ConsoleSpanExporter()
+    elif exporter == "file":
+        if not file_path:
+            raise ValueError("TRACING_FILE is required when TRACING_EXPORTER=file")
+        span_exporter = ConsoleSpanExporter(
+            out=open(file_path, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    elif exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError as e:
+            raise RuntimeError("TRACING_EXPORTER=otlp requires the 'opentelemetry-exporter-otlp-proto-http' package") from e
+        span_exporter = OTLPSpanExporter(endpoint=endpoint) if endpoint else OTLPSpanExporter()
+    else:
+        raise ValueError(f"Unknown TRACING_EXPORTER: {exporter}")
+    
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(provider)
+    logger.info(f"Tracing enabled: exporter={exporter}")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush buffered spans, if an SDK provider is installed."""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+def inject_trace_headers(headers: Dict[str, str], span: Optional[trace.Span] = None) -> Dict[str, str]:
+    """Add W3C ``traceparent`` headers for ``span`` (default: the current span) to an outgoing request."""
+    propagate.inject(headers, context=trace.set_span_in_context(span) if span is not None else None)
+    return headers
+
+
+def extract_trace_context(headers) -> Context:
+    """Parent context from an incoming request's ``traceparent`` header, else the current one."""
+    return propagate.extract(headers, context=context.get_current())
+
+
+def trace_engine(db_engine, label: str) -> None:
+    """Open a ``db.query`` span around every statement executed on a (sync) SQLAlchemy engine."""
+    if db_engine is None:
+        return
+    
+    system = db_engine.dialect.name
+    
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def _start_span(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span(
+            "db.query",
+            kind=trace.SpanKind.CLIENT,
+            attributes={
+                "db.system": system,
+                "db.engine": label,
+                "db.statement": statement[:MAX_STATEMENT_LENGTH],
+                "db.executemany": executemany,
+            }
+        )
+        conn.info.setdefault("tracing_spans", []).append(span)
+    
+    @event.listens_for(db_engine, "after_cursor_execute")
+    def _end_span(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("tracing_spans")
+        if spans:
+            span = spans.pop()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute("db.rowcount", cursor.rowcount)
+            span.end()
+    
+    @event.listens_for(db_engine, "handle_error")
+    def _fail_span(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("tracing_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            span.record_exception(exception_context.original_exception)
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(exception_context.original_exception)))
+            span.end()
@@ -0,0 +1,118 @@
+"""
+Local stand-in for LangFlow's ``/api/v1/run/{flow_id}`` endpoint.
+
+Answers with the same response shape as a real flow run after a configurable
+delay, can fail a share of requests, supports ``?stream=true`` (one JSON event
+per line) and can pad responses with fake intermediate agent steps to mimic
+large agent traces. Run with:
+
+    python -m bench.langflow_stub --port 7860 --latency-ms 300 --jitter-ms 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Defaults, overridable from the command line or the environment
+config = {
+    "latency_ms": float(os.getenv("STUB_LATENCY_MS", 200)),
+    "jitter_ms": float(os.getenv("STUB_JITTER_MS", 50)),
+    "error_rate": float(os.getenv("STUB_ERROR_RATE", 0)),
+    "error_status": int(os.getenv("STUB_ERROR_STATUS", 503)),
+    "tokens": int(os.getenv("STUB_TOKENS", 20)),
+    "trace_kb": int(os.getenv("STUB_TRACE_KB", 0)),
+}
+
+app = FastAPI(title="LangFlow stub")
+
+
+def delay_seconds() -> float:
+    return max(0.0, random.gauss(config["latency_ms"], config["jitter_ms"]) / 1000)
+
+
+def reply_text(input_value: str) -> str:
+    words = ["Based", "on", "your", "application", "the", "estimated", "rate", "is", "5.2%."]
+    return " ".join(words[i % len(words)] for i in range(config["tokens"])) + f" (re: {input_value[:40]})"
+
+
+def agent_steps() -> list:
+    """Fake intermediate tool calls adding roughly ``trace_kb`` KB to the payload."""
+    if not config["trace_kb"]:
+        return []
+    step = {"tool": "loan_lookup", "input": {"loan_id": 1}, "output": "x" * 1000}
+    return [dict(step, index=i) for i in range(config["trace_kb"])]
+
+
+def run_result(input_value: str, session_id: str) -> dict:
+    text = reply_text(input_value)
+    return {
+        "session_id": session_id,
+        "outputs": [{
+            "inputs": {"input_value": input_value},
+            "outputs": [{
+                "results": {"message": {"text": text, "sender": "Machine", "session_id": session_id}},
+                "artifacts": {"message": text, "steps": agent_steps()},
+                "messages": [{"message": text, "sender": "Machine"}],
+            }],
+        }],
+    }
+
+
+@app.post("/api/v1/run/{flow_id}")
+async def run_flow(flow_id: str, request: Request, stream: bool = False):
+    body = await request.json()
+    input_value = body.get("input_value", "")
+    session_id = (body.get("tweaks") or {}).get("session_id") or str(uuid.uuid4())
+    
+    if random.random() < config["error_rate"]:
+        await asyncio.sleep(delay_seconds() / 10)
+        return JSONResponse({"detail": "stub failure"}, status_code=config["error_status"])
+    
+    if not stream:
+        await asyncio.sleep(delay_seconds())
+        return run_result(input_value, session_id)
+    
+    async def events():
+        yield json.dumps({"event": "add_message", "data": {"sender": "User", "text": input_value}}) + "\n"
+        words = reply_text(input_value).split(" ")
+        per_token = delay_seconds() / max(len(words), 1)
+        for i, word in enumerate(words):
+            await asyncio.sleep(per_token)
+            yield json.dumps({"event": "token", "data": {"chunk": word if i == 0 else " " + word}}) + "\n"
+        yield json.dumps({"event": "end", "data": {"result": run_result(input_value, session_id)}}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a fake LangFlow run endpoint for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7860)
+    parser.add_argument("--latency-ms", type=float, default=config["latency_ms"], help="mean response delay")
+    parser.add_argument("--jitter-ms", type=float, default=config["jitter_ms"], help="standard deviation of the delay")
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"], help="share of requests that fail (0-1)")
+    parser.add_argument("--error-status", type=int, default=config["error_status"], help="status code of failed requests")
+    parser.add_argument("--tokens", type=int, default=config["tokens"], help="words per reply")
+    parser.add_argument("--trace-kb", type=int, default=config["trace_kb"], help="KB of fake agent steps per reply")
+    args = parser.parse_args()
+    
+    config.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        tokens=args.tokens,
+        trace_kb=args.trace_kb,
+    )
+    
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
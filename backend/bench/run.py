@@ -0,0 +1,260 @@
+"""
+Benchmark harness for the backend API.
+
+Drives a running backend with a fixed number of concurrent workers per scenario
+and reports throughput and latency percentiles. Point the backend at the LangFlow
+stub (``python -m bench.langflow_stub``) and a local Postgres for repeatable runs:
+
+    python -m bench.run --base-url http://localhost:8000 --seed 20000
+    python -m bench.run --scenarios agent,search --concurrency 64 --requests 5000 --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+# A scenario builds (method, path, kwargs for httpx.request) from the worker and request number
+Scenario = Callable[[int, int, int], Tuple[str, str, Dict[str, Any]]]
+
+
+def agent(worker: int, i: int, loan_count: int) -> Tuple[str, str, Dict[str, Any]]:
+    # One session per worker, so turns are not serialised behind each other or coalesced.
+    # The message matches no fast-path intent, so every turn is a LangFlow round trip
+    return "POST", "/agent", {"json": {"session_id": f"bench-{worker}", "message": f"Explain the risk factors behind loan {i}"}}
+
+
+def agent_fast_path(worker: int, i: int, loan_count: int) -> Tuple[str, str, Dict[str, Any]]:
+    # Lookups and rate questions the backend answers in-process, without LangFlow
+    loan_id = random.randint(1, max(loan_count, 1))
+    message = f"Show loan {loan_id}" if i % 2 else f"What rate would loan {loan_id} get?"
+    return "POST", "/agent", {"json": {"session_id": f"bench-fast-{worker}", "message": message}}
+
+
+def agent_stream(worker: int, i: int, loan_count: int) -> Tuple[str, str, Dict[str, Any]]:
+    return "POST", "/agent/stream", {"json": {"session_id": f"bench-stream-{worker}", "message": f"Explain loan {i}"}}
+
+
+def loans_page(worker: int, i: int, loan_count: int) -> Tuple[str, str, Dict[str, Any]]:
+    return "GET", "/loans", {"params": {"after_id": random.randint(0, max(loan_count - 100, 0)), "limit": 100}}
+
+
+def loan_lookup(worker: int, i: int, loan_count: int) -> Tuple[str, str, Dict[str, Any]]:
+    return "GET", f"/loans/{random.randint(1, max(loan_count, 1))}", {}
+
+
+def search(worker: int, i: int, loan_count: int) -> Tuple[str, str, Dict[str, Any]]:
+    low = random.randint(300, 750)
+    return "GET", "/loans/search", {"params": {
+        "min_creditscore": low,
+        "max_creditscore": low + 50,
+        "min_annualincome": random.choice([20000, 50000, 80000]),
+        "sort": "-annualincome",
+        "limit": 50,
+    }}
+
+
+def calculate_rate(worker: int, i: int, loan_count: int) -> Tuple[str, str, Dict[str, Any]]:
+    return "POST", "/calculate-rate", {"params": {
+        "income": random.randint(20000, 200000),
+        "loan_amount": random.randint(5000, 500000),
+        "duration": random.choice([12, 24, 36, 60, 120, 240, 360]),
+    }}
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "agent": agent,
+    "agent_fast_path": agent_fast_path,
+    "agent_stream": agent_stream,
+    "loans": loans_page,
+    "loan": loan_lookup,
+    "search": search,
+    "rate": calculate_rate,
+}
+
+
+def synthetic_loan(rng: random.Random) -> Dict[str, Any]:
+    """One plausible LoanApplication row."""
+    income = rng.randint(15000, 250000)
+    amount = rng.randint(5000, 300000)
+    debt = rng.randint(0, 3000)
+    assets = rng.randint(0, 500000)
+    liabilities = rng.randint(0, 200000)
+    return {
+        "applicationdate": (date(2018, 1, 1) + timedelta(days=rng.randint(0, 2500))).isoformat(),
+        "age": rng.randint(18, 80),
+        "annualincome": income,
+        "creditscore": rng.randint(300, 850),
+        "employmentstatus": rng.choice(["Employed", "Self-Employed", "Unemployed"]),
+        "educationlevel": rng.choice(["High School", "Associate", "Bachelor", "Master", "Doctorate"]),
+        "experience": rng.randint(0, 40),
+        "loanamount": amount,
+        "loanduration": rng.choice([12, 24, 36, 48, 60, 72, 84, 96, 108, 120]),
+        "maritalstatus": rng.choice(["Single", "Married", "Divorced", "Widowed"]),
+        "numberofdependents": rng.randint(0, 5),
+        "homeownershipstatus": rng.choice(["Own", "Rent", "Mortgage", "Other"]),
+        "monthlydebtpayments": debt,
+        "creditcardutilizationrate": round(rng.random(), 3),
+        "numberofopencreditlines": rng.randint(0, 10),
+        "numberofcreditinquiries": rng.randint(0, 6),
+        "debttoincomeratio": round(rng.uniform(0, 0.9), 3),
+        "bankruptcyhistory": rng.random() < 0.05,
+        "loanpurpose": rng.choice(["Home", "Auto", "Education", "Debt Consolidation", "Other"]),
+        "previousloandefaults": rng.random() < 0.1,
+        "paymenthistory": str(rng.randint(0, 40)),
+        "lengthofcredithistory": rng.randint(1, 30),
+        "savingsaccountbalance": rng.randint(0, 50000),
+        "checkingaccountbalance": rng.randint(0, 20000),
+        "totalassets": assets,
+        "totalliabilities": liabilities,
+        "monthlyincome": round(income / 12, 2),
+        "utilitybillspaymenthistory": str(round(rng.random(), 3)),
+        "jobtenure": rng.randint(0, 20),
+        "networth": assets - liabilities,
+        "baseinterestrate": round(rng.uniform(0.1, 0.3), 3),
+        "interestrate": round(rng.uniform(0.1, 0.4), 3),
+        "monthlyloanpayment": round(amount / 60, 2),
+        "totaldebttoincomeratio": round(rng.uniform(0, 1), 3),
+        "loanapproved": rng.random() < 0.3,
+        "riskscore": rng.randint(25, 80),
+    }
+
+
+async def seed_loans(client: httpx.AsyncClient, count: int, batch_size: int = 5000) -> None:
+    """Insert ``count`` synthetic loans through POST /loans/bulk."""
+    rng = random.Random(42)
+    done = 0
+    while done < count:
+        rows = [synthetic_loan(rng) for _ in range(min(batch_size, count - done))]
+        body = "\n".join(json.dumps(row) for row in rows)
+        response = await client.post("/loans/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+        response.raise_for_status()
+        done += len(rows)
+        print(f"seeded {done}/{count} loans", file=sys.stderr)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    concurrency: int,
+    requests: int,
+    loan_count: int
+) -> Dict[str, Any]:
+    """Run ``requests`` calls of one scenario through ``concurrency`` closed-loop workers."""
+    scenario = SCENARIOS[name]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(requests))
+    
+    async def worker(worker_id: int) -> None:
+        for i in counter:
+            method, path, kwargs = scenario(worker_id, i, loan_count)
+            start = time.perf_counter()
+            try:
+                # The whole body is read, so streaming scenarios measure the full reply
+                response = await client.request(method, path, **kwargs)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(latencies) - ok,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(ms.max()), 2) if len(ms) else 0.0,
+    }
+
+
+def print_report(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    header = f"{'scenario':<14}{'conc':>6}{'reqs':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['scenario']:<14}{result['concurrency']:>6}{result['requests']:>8}{result['errors']:>8}"
+            f"{result['rps']:>10}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+        )
+        before = (baseline or {}).get(result["scenario"])
+        if before:
+            deltas = []
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                if before.get(key):
+                    deltas.append(f"{key} {100 * (result[key] - before[key]) / before[key]:+.1f}%")
+            print(f"{'':<14}vs baseline: {', '.join(deltas)}")
+
+
+async def main_async(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.seed:
+            await seed_loans(client, args.seed)
+        loan_count = args.seed or args.loan_count
+        
+        results = []
+        for name in args.scenarios:
+            if args.warmup:
+                await run_scenario(client, name, args.concurrency, args.warmup, loan_count)
+            result = await run_scenario(client, name, args.concurrency, args.requests, loan_count)
+            print(f"finished {name}: {result['rps']} req/s", file=sys.stderr)
+            results.append(result)
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the loan/agent API.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenarios", default="agent,loans,loan,search,rate",
+                        help=f"comma separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent workers per scenario")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests before each scenario")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0, help="insert this many synthetic loans first")
+    parser.add_argument("--loan-count", type=int, default=1000, help="highest loan id to query when not seeding")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+    
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    
+    random.seed(args.seed or 0)
+    results = asyncio.run(main_async(args))
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {result["scenario"]: result for result in json.load(f)["results"]}
+    print_report(results, baseline)
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": args.base_url, "timestamp": time.time(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Gunicorn settings for production, run from backend/:
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Every value can be overridden on the command line or through the environment.
+"""
+import os
+import sys
+
+# Only the light launcher helpers: the master should not import the app unless preloading
+from app.serve import check_workers, default_workers, reset_metrics_dir, uvicorn_worker_class
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = default_workers()
+worker_class = uvicorn_worker_class()
+
+# A worker whose event loop has not checked in for this long is killed and replaced;
+# awaited LangFlow calls do not block the loop, so this only catches real hangs
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+# Time old workers get to finish in-flight requests on SIGHUP/SIGTERM
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+# Idle keep-alive seconds; keep below the load balancer's idle timeout
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# Recycle workers after this many requests (0 = never), staggered by the jitter
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+
+# Import the app once in the master so workers fork from it; SIGHUP then keeps the old code
+preload_app = os.getenv("GUNICORN_PRELOAD", "").lower() in ("1", "true", "yes")
+
+# The app logs requests itself (with correlation ids)
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def on_starting(server):
+    """
+    Refuse several workers with per-process state, and start /metrics totals from zero
+    (in multiprocess mode) on every fresh start, but not on SIGHUP.
+    """
+    try:
+        check_workers(server.cfg.workers)
+    except ValueError as e:
+        server.log.error(str(e))
+        sys.exit(1)
+    if server.cfg.workers > 1 and not os.getenv("METRICS_MULTIPROC_DIR"):
+        server.log.warning("Without METRICS_MULTIPROC_DIR, each scrape of /metrics reports only the worker that answers it")
+    if server.cfg.workers > 1:
+        # The LangFlow gate is per worker, so the server as a whole admits workers times as many calls
+        per_worker = int(os.getenv("LANGFLOW_MAX_CONCURRENCY", 20))
+        server.log.info(
+            f"LangFlow gate: {per_worker} concurrent calls per worker, up to {per_worker * server.cfg.workers} in total; "
+            f"lower LANGFLOW_MAX_CONCURRENCY to fit what LangFlow can take"
+        )
+    reset_metrics_dir()
+
+
+def post_fork(server, worker):
+    """Give each worker its own database pools when the master imported the app."""
+    database = sys.modules.get("app.database")
+    if database is None:
+        return
+    # Engines are created on first use, so the master usually has none; close=False
+    # leaves the parent's connections alone instead of closing sockets it still owns
+    engine, async_engine = database.current_engines()
+    if engine is not None:
+        engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+
+def when_ready(server):
+    server.log.info(f"Serving with {server.cfg.workers} {server.cfg.worker_class_str} workers")
@@ -0,0 +1,23 @@
+-- Indexes backing /loans/search range filters, sorting and the employmentstatus text match.
+--
+-- Apply with autocommit (CREATE INDEX CONCURRENTLY cannot run inside a transaction):
+--   psql "$DATABASE_URL" -f backend/migrations/0001_loan_search_indexes.sql
+--
+-- Index names match the ones SQLAlchemy generates from `index=True` on the
+-- LoanApplication model, so tables created with create_all are not indexed twice.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_LoanApplication_applicationdate" ON "LoanApplication" (applicationdate);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_LoanApplication_age" ON "LoanApplication" (age);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_LoanApplication_annualincome" ON "LoanApplication" (annualincome);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_LoanApplication_creditscore" ON "LoanApplication" (creditscore);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_LoanApplication_loanamount" ON "LoanApplication" (loanamount);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_LoanApplication_debttoincomeratio" ON "LoanApplication" (debttoincomeratio);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_LoanApplication_interestrate" ON "LoanApplication" (interestrate);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_LoanApplication_riskscore" ON "LoanApplication" (riskscore);
+
+-- ILIKE '%...%' can only use a trigram index, never a btree
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_LoanApplication_employmentstatus_trgm"
+    ON "LoanApplication" USING gin (employmentstatus gin_trgm_ops);
+
+ANALYZE "LoanApplication";
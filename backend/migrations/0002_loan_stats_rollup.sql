@@ -0,0 +1,64 @@
+-- Pre-aggregated loan statistics behind /loans/aggregate (used when LOAN_STATS_VIEW=true).
+--
+-- Apply once:
+--   psql "$DATABASE_URL" -f backend/migrations/0002_loan_stats_rollup.sql
+--
+-- One row per combination of the low-cardinality columns below, holding counts,
+-- sums and bounds that coarser groupings are re-aggregated from. Averages are
+-- recomputed as sum/n, so they stay exact; percentiles always read the table.
+--
+-- Postgres has no incremental view maintenance: the backend re-runs
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY every LOAN_STATS_REFRESH_SECONDS,
+-- but only after a loan write, and readers are never blocked while it runs.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS loan_stats_rollup AS
+SELECT
+    -- NULL-safe key for the unique index REFRESH ... CONCURRENTLY requires
+    concat_ws(
+        '|',
+        coalesce(employmentstatus, '\N'),
+        coalesce(educationlevel, '\N'),
+        coalesce(maritalstatus, '\N'),
+        coalesce(homeownershipstatus, '\N'),
+        coalesce(loanpurpose, '\N'),
+        coalesce(loanapproved::text, '\N')
+    ) AS group_key,
+    employmentstatus,
+    educationlevel,
+    maritalstatus,
+    homeownershipstatus,
+    loanpurpose,
+    loanapproved,
+    count(*) AS row_count,
+    count(loanapproved) AS n_loanapproved,
+    count(*) FILTER (WHERE loanapproved) AS approved_count,
+    count(annualincome) AS n_annualincome,
+    sum(annualincome) AS sum_annualincome,
+    min(annualincome) AS min_annualincome,
+    max(annualincome) AS max_annualincome,
+    count(creditscore) AS n_creditscore,
+    sum(creditscore) AS sum_creditscore,
+    min(creditscore) AS min_creditscore,
+    max(creditscore) AS max_creditscore,
+    count(loanamount) AS n_loanamount,
+    sum(loanamount) AS sum_loanamount,
+    min(loanamount) AS min_loanamount,
+    max(loanamount) AS max_loanamount,
+    count(debttoincomeratio) AS n_debttoincomeratio,
+    sum(debttoincomeratio) AS sum_debttoincomeratio,
+    min(debttoincomeratio) AS min_debttoincomeratio,
+    max(debttoincomeratio) AS max_debttoincomeratio,
+    count(riskscore) AS n_riskscore,
+    sum(riskscore) AS sum_riskscore,
+    min(riskscore) AS min_riskscore,
+    max(riskscore) AS max_riskscore,
+    count(interestrate) AS n_interestrate,
+    sum(interestrate) AS sum_interestrate,
+    min(interestrate) AS min_interestrate,
+    max(interestrate) AS max_interestrate
+FROM "LoanApplication"
+GROUP BY employmentstatus, educationlevel, maritalstatus, homeownershipstatus, loanpurpose, loanapproved;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_loan_stats_rollup_group_key ON loan_stats_rollup (group_key);
+
+ANALYZE loan_stats_rollup;
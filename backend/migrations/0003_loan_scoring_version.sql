@@ -0,0 +1,8 @@
+-- Model version that computed each row's riskscore/interestrate/monthlyloanpayment/totaldebttoincomeratio.
+--
+--   psql "$DATABASE_URL" -f backend/migrations/0003_loan_scoring_version.sql
+--
+-- Existing rows keep their client-supplied values (scoringversion NULL) until backfilled:
+--   cd backend && python -m app.scoring
+
+ALTER TABLE "LoanApplication" ADD COLUMN IF NOT EXISTS scoringversion VARCHAR;